@@ -1,2 +1,7 @@
-from .result_benchmark import run_result_benchmark
+from .result_benchmark import (
+    run_result_benchmark,
+    run_mode_benchmark,
+    run_disk_cache_benchmark,
+)
 from .time_benchmark import run_time_benchmark
+from .numerics_benchmark import run_numerics_benchmark
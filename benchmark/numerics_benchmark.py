@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+from functools import reduce
+import numpy as np
+from random import choice, randint, sample, random
+from typing import Dict, List
+
+from quasim import QuaSim, Circuit, expectation, get_unitary
+from quasim.gates import (
+    CCX,
+    CPhase,
+    CRX,
+    CRY,
+    CRZ,
+    CX,
+    H,
+    Parameter,
+    Phase,
+    RX,
+    RY,
+    RZ,
+    S,
+    Swap,
+)
+from quasim.gates._matrices import X_MATRIX, Y_MATRIX, Z_MATRIX
+
+# The numerical APIs (expectation values, gradients, sweeps, and
+# sampling) are checked against dense reference computations based on
+# get_unitary, so that no other simulator is required.
+
+PAULI_MATRICES = {
+    "I": np.eye(2, dtype=np.complex128),
+    "X": X_MATRIX,
+    "Y": Y_MATRIX,
+    "Z": Z_MATRIX,
+}
+
+ROTATIONS = [RX, RY, RZ, Phase]
+CONTROLLED_ROTATIONS = [CRX, CRY, CRZ, CPhase]
+
+
+def create_parameterized_circuit(
+    gate_count: int, qubit_num: int, parameters: List[Parameter]
+) -> Circuit:
+    circuit = Circuit(qubit_num)
+
+    # Every parameter is used at least once.
+    for parameter in parameters:
+        target_qubit = randint(0, qubit_num - 1)
+        circuit.apply(choice(ROTATIONS)(target_qubit, parameter))
+
+    for _ in range(gate_count):
+        gate_type = choice(["H", "S", "CX", "CCX", "SWAP", "R", "CR"])
+
+        if gate_type == "H":
+            circuit.apply(H(randint(0, qubit_num - 1)))
+
+        elif gate_type == "S":
+            circuit.apply(S(randint(0, qubit_num - 1)))
+
+        elif gate_type == "CX":
+            target_qubit, control_qubit = sample(range(0, qubit_num), 2)
+            circuit.apply(CX(control_qubit, target_qubit))
+
+        elif gate_type == "CCX":
+            target_qubit, control_qubit1, control_qubit2 = sample(
+                range(0, qubit_num), 3
+            )
+            circuit.apply(CCX(control_qubit1, control_qubit2, target_qubit))
+
+        elif gate_type == "SWAP":
+            qubit1, qubit2 = sample(range(0, qubit_num), 2)
+            circuit.apply(Swap(qubit1, qubit2))
+
+        elif gate_type == "R":
+            target_qubit = randint(0, qubit_num - 1)
+            circuit.apply(choice(ROTATIONS)(target_qubit, choice(parameters)))
+
+        else:
+            target_qubit, control_qubit = sample(range(0, qubit_num), 2)
+            circuit.apply(
+                choice(CONTROLLED_ROTATIONS)(
+                    control_qubit, target_qubit, choice(parameters)
+                )
+            )
+
+    return circuit
+
+
+def create_random_pauli_string(qubit_num: int) -> str:
+    return "".join(choice("IXYZ") for _ in range(qubit_num))
+
+
+def get_dense_state(circuit: Circuit) -> np.ndarray:
+    return get_unitary(circuit)[:, 0]
+
+
+def get_dense_expectation(state: np.ndarray, pauli_string: str) -> float:
+    operator = reduce(np.kron, [PAULI_MATRICES[pauli] for pauli in pauli_string])
+    return float(np.vdot(state, operator @ state).real)
+
+
+def run_numerics_benchmark(
+    circuit_count=20, gate_count=30, qubit_num=4, parameter_count=3
+):
+
+    quasim_simulator = QuaSim()
+    parameters = [Parameter(f"theta{index}") for index in range(parameter_count)]
+
+    for _ in range(circuit_count):
+        circuit = create_parameterized_circuit(gate_count, qubit_num, parameters)
+        values = np.array([random() * 2 * np.pi - np.pi for _ in parameters])
+        pauli_string = create_random_pauli_string(qubit_num)
+
+        bound_circuit = circuit.bind(values)
+        quasim_simulator.evaluate([bound_circuit])
+        dense_state = get_dense_state(bound_circuit)
+
+        errors: Dict[str, float] = {}
+
+        # Expectation values of the factorized state.
+        errors["expectation"] = abs(
+            expectation(bound_circuit, pauli_string)
+            - get_dense_expectation(dense_state, pauli_string)
+        )
+
+        # Gradients by central finite differences of dense expectation values.
+        step = 1e-6
+        finite_differences = []
+        for index in range(len(parameters)):
+            shift = np.zeros(len(parameters))
+            shift[index] = step
+
+            upper = get_dense_state(circuit.bind(values + shift))
+            lower = get_dense_state(circuit.bind(values - shift))
+            finite_differences.append(
+                (
+                    get_dense_expectation(upper, pauli_string)
+                    - get_dense_expectation(lower, pauli_string)
+                )
+                / (2 * step)
+            )
+
+        gradients = quasim_simulator.gradient(circuit, pauli_string, values)
+        errors["gradient"] = np.abs(gradients - finite_differences).max()
+
+        # Sweeps over a few rows of parameter values.
+        sweep_values = np.array(
+            [values, -values, np.zeros(len(parameters)), values / 2]
+        )
+        sweep_states = quasim_simulator.sweep(circuit, sweep_values)
+        errors["sweep"] = max(
+            np.abs(sweep_state - get_dense_state(circuit.bind(row))).max()
+            for sweep_state, row in zip(sweep_states, sweep_values)
+        )
+
+        # Sampled frequencies, compared by their total variation distance.
+        shots = 20000
+        indices = bound_circuit.sample(shots, seed=0, output="indices")
+        frequencies = np.bincount(indices, minlength=2**qubit_num) / shots
+        errors["sampling"] = np.abs(frequencies - np.abs(dense_state) ** 2).sum() / 2
+
+        tolerances = {
+            "expectation": 1e-8,
+            "gradient": 1e-5,
+            "sweep": 1e-8,
+            "sampling": 0.05,
+        }
+        divergences = {
+            check: error for check, error in errors.items() if error > tolerances[check]
+        }
+
+        if len(divergences) > 0:
+            print(f"\nEncountered numerical divergences ({divergences}) on")
+            print(f"\t{circuit}")
+            print(f"\twith values {values} and Pauli string {pauli_string}")
+            break
+
+    else:
+        print(
+            f"Finished numerics benchmarking. No significant divergences between quasim and dense references encountered."
+        )
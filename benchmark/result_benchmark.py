@@ -4,9 +4,17 @@ from datetime import datetime
 import numpy as np
 from pprint import pprint
 from scipy.spatial import distance
-from typing import List, Tuple
+import tempfile
+from typing import Callable, Dict, List, Tuple
 
-from quasim import QuaSim, Circuit
+from quasim import (
+    QuaSim,
+    Circuit,
+    DiskCache,
+    MatrixEngine,
+    PrefixCache,
+    ResultCache,
+)
 
 from qiskit import QuantumCircuit, Aer
 
@@ -17,10 +25,31 @@ from .utils import (
 )
 
 
-def run_result_benchmark(circuit_count=100, gate_count=40, qubit_num=4):
+# Simulator configurations whose results are compared against qiskit
+# by run_mode_benchmark.
+SIMULATOR_MODES: Dict[str, Callable[[], QuaSim]] = {
+    "matrix engine": lambda: QuaSim(engine=MatrixEngine()),
+    "no deferral": lambda: QuaSim(defer_diagonal_gates=False),
+    "no basis tracking": lambda: QuaSim(track_basis_states=False),
+    "prefix cache": lambda: QuaSim(prefix_cache=PrefixCache(snapshot_interval=4)),
+    "result cache": lambda: QuaSim(result_cache=ResultCache()),
+    "disk cache": lambda: QuaSim(
+        disk_cache=DiskCache(tempfile.mkdtemp(), max_bytes=2**20)
+    ),
+    "optimize": lambda: QuaSim(optimize=True),
+    "fuse gates": lambda: QuaSim(fuse_gates=True),
+    "blocks": lambda: QuaSim(max_block_qubits=3),
+    "split groups": lambda: QuaSim(split_groups=True),
+}
+
+
+def run_result_benchmark(
+    circuit_count=100, gate_count=40, qubit_num=4, quasim_simulator: QuaSim = None
+):
 
     qiskit_backend = Aer.get_backend("statevector_simulator")
-    quasim_simulator = QuaSim()
+    if quasim_simulator is None:
+        quasim_simulator = QuaSim()
 
     for _ in range(circuit_count):
         qiskit_circuit, quasim_circuit = create_random_circuits(
@@ -47,3 +76,62 @@ def run_result_benchmark(circuit_count=100, gate_count=40, qubit_num=4):
         print(
             f"Finished result benchmarking. No significant divergences between qiskit and quasim encountered."
         )
+
+
+def run_mode_benchmark(circuit_count=20, gate_count=40, qubit_num=4):
+
+    for mode, create_simulator in SIMULATOR_MODES.items():
+        print(f"Result benchmarking with {mode}:")
+        run_result_benchmark(
+            circuit_count=circuit_count,
+            gate_count=gate_count,
+            qubit_num=qubit_num,
+            quasim_simulator=create_simulator(),
+        )
+
+
+def run_disk_cache_benchmark(circuit_count=5, gate_count=40, qubit_num=5):
+    """Check that states served by a disk cache are not modified when
+    their region of the arena is overwritten by later circuits."""
+
+    directory = tempfile.mkdtemp()
+    max_bytes = 3 * 2**qubit_num * np.dtype(np.complex128).itemsize
+
+    _, quasim_circuit = create_random_circuits(
+        gate_count=gate_count, qubit_num=qubit_num
+    )
+    QuaSim(disk_cache=DiskCache(directory, max_bytes=max_bytes)).evaluate(
+        [quasim_circuit.copy()]
+    )
+    reference_state = quasim_circuit.copy()
+    QuaSim().evaluate([reference_state])
+
+    result_cache = ResultCache()
+    quasim_simulator = QuaSim(
+        result_cache=result_cache,
+        disk_cache=DiskCache(directory, max_bytes=max_bytes),
+    )
+
+    cached_circuit = quasim_circuit.copy()
+    quasim_simulator.evaluate([cached_circuit])
+
+    for _ in range(circuit_count):
+        _, other_circuit = create_random_circuits(
+            gate_count=gate_count, qubit_num=qubit_num
+        )
+        quasim_simulator.evaluate([other_circuit])
+
+    repeated_circuit = quasim_circuit.copy()
+    quasim_simulator.evaluate([repeated_circuit])
+
+    if (
+        quasim_simulator.disk_cache.hits == 0
+        or result_cache.hits == 0
+        or not np.allclose(cached_circuit.state, reference_state.state)
+        or not np.allclose(repeated_circuit.state, reference_state.state)
+    ):
+        print(f"\nEncountered modified disk cache state on")
+        print(f"\t{quasim_circuit}")
+
+    else:
+        print(f"Finished disk cache benchmarking. No modified states encountered.")
@@ -1,2 +1,7 @@
+from .cache import DiskCache, PrefixCache, ResultCache
 from .circuit import Circuit, get_unitary
+from .engines import IEngine, KernelEngine, MatrixEngine
+from .observables import expectation
+from .optimizer import OptimizationReport, optimize_circuit
 from .simulator import QuaSim
+from .state import FactorizedState
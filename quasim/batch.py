@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+from functools import lru_cache
+import numpy as np
+from typing import Dict, List, Tuple
+
+from .circuit import Circuit
+from .gates import IGate, Swap, Gate, CGate, CCGate
+from .kernels import (
+    apply_batched_diagonal_kernel,
+    apply_batched_matrix_kernel,
+    apply_diagonal_kernel,
+    apply_flip_kernel,
+    apply_matrix_kernel,
+    apply_swap_kernel,
+    get_control_mask,
+)
+
+
+@lru_cache(maxsize=None)
+def _get_gate_kind(gate_class: type) -> str:
+    if gate_class == Swap:
+        return "swap"
+    elif issubclass(gate_class, Gate):
+        return "gate"
+    elif issubclass(gate_class, CGate):
+        return "cgate"
+    elif issubclass(gate_class, CCGate):
+        return "ccgate"
+    else:
+        raise NotImplementedError(f"Unknown gate type {gate_class}")
+
+
+def get_batch_key(gate: IGate) -> Tuple[Tuple, Tuple[int, ...]]:
+    """Return a key describing which gates can be applied to a batch
+    of states at once (swaps of the same qubits, or (controlled)
+    gates with the same target qubit), together with the control
+    qubits of the gate."""
+    kind = _get_gate_kind(type(gate))
+
+    if kind == "swap":
+        return ("swap", min(gate.qubits), max(gate.qubits)), ()
+    elif kind == "gate":
+        return ("target", gate.target_qubit), ()
+    elif kind == "cgate":
+        return ("target", gate.target_qubit), (gate.control_qubit,)
+    else:
+        return (
+            ("target", gate.target_qubit),
+            (gate.control_qubit1, gate.control_qubit2),
+        )
+
+
+def apply_batched_gates(
+    states: np.ndarray,
+    key: Tuple,
+    gates: List[IGate],
+    controls: List[Tuple[int, ...]],
+    qubit_num: int,
+) -> np.ndarray:
+    """Apply gates sharing the same batch key to a batch of states
+    of shape (len(gates), 2^qubit_num), where the i-th gate (with
+    the i-th control qubits) is applied to the i-th state."""
+    if key[0] == "swap":
+        _, qubit1, qubit2 = key
+        return apply_swap_kernel(states, qubit1, qubit2, qubit_num)
+
+    _, target = key
+
+    matrices = np.stack([gate.matrix for gate in gates])
+
+    if any(len(gate_controls) > 0 for gate_controls in controls):
+        control_masks = np.stack(
+            [
+                get_control_mask(target, gate_controls, qubit_num)
+                for gate_controls in controls
+            ]
+        )
+    else:
+        control_masks = None
+
+    return apply_batched_matrix_kernel(
+        states, matrices, target, qubit_num, control_masks=control_masks
+    )
+
+
+def evaluate_batch(circuits: List[Circuit], batch_size: int = None) -> None:
+    """Evaluate a list of circuits by simulating circuits of equal width
+    together and store the state at the end of each circuit in
+    circuit.state. Circuits that already have a state are skipped.
+
+    At most batch_size circuits are simulated at once, which limits
+    the memory used for their states.
+    """
+    circuits_by_width: Dict[int, List[Circuit]] = {}
+    for circuit in circuits:
+        if not circuit.is_evaluated:
+            circuits_by_width.setdefault(circuit.qubit_num, []).append(circuit)
+
+    for qubit_num, width_circuits in circuits_by_width.items():
+        if batch_size is None:
+            step = len(width_circuits)
+        else:
+            step = batch_size
+
+        for start in range(0, len(width_circuits), step):
+            _evaluate_equal_width_batch(width_circuits[start : start + step], qubit_num)
+
+
+def _evaluate_equal_width_batch(circuits: List[Circuit], qubit_num: int) -> None:
+    """Simulate circuits of equal width on a stacked state array of shape
+    (len(circuits), 2^qubit_num).
+
+    The circuits are stepped through gate by gate. At each step, all
+    circuits whose current gate shares the same batch key are evolved
+    by a single kernel call. Circuits that ran out of gates are left
+    untouched, which pads them with identities.
+    """
+    states = np.zeros((len(circuits), 2**qubit_num), dtype=np.complex128)
+    states[:, 0] = 1
+
+    depth = max(len(circuit.gates) for circuit in circuits)
+    for step in range(depth):
+        batches: Dict[Tuple, Tuple[List[int], List[IGate], List[Tuple]]] = {}
+        for row, circuit in enumerate(circuits):
+            if step >= len(circuit.gates):
+                continue
+
+            gate = circuit.gates[step]
+            key, controls = get_batch_key(gate)
+
+            batch = batches.get(key)
+            if batch is None:
+                batch = batches[key] = ([], [], [])
+
+            batch[0].append(row)
+            batch[1].append(gate)
+            batch[2].append(controls)
+
+        for key, (rows, gates, controls) in batches.items():
+            if len(rows) == len(circuits):
+                states = apply_batched_gates(states, key, gates, controls, qubit_num)
+            else:
+                states[rows] = apply_batched_gates(
+                    states[rows], key, gates, controls, qubit_num
+                )
+
+    for row, circuit in enumerate(circuits):
+        circuit.set_state(states[row].copy())
+
+
+def evaluate_sweep(
+    gates: List[IGate],
+    sweep_matrices: Dict[int, np.ndarray],
+    sweep_size: int,
+    qubit_num: int,
+) -> np.ndarray:
+    """Simulate a circuit for all values of a parameter sweep on a
+    stacked state array of shape (sweep_size, 2^qubit_num), which is
+    returned.
+
+    Since all circuits of the sweep share their gates and qubits,
+    every gate is applied to all states by a single in-place kernel
+    call. The parameterized gates are applied with one matrix per
+    state, which are taken from sweep_matrices (keyed by gate
+    position, see get_sweep_matrices).
+    """
+    states = np.zeros((sweep_size, 2**qubit_num), dtype=np.complex128)
+    states[:, 0] = 1
+
+    for position, gate in enumerate(gates):
+        key, controls = get_batch_key(gate)
+
+        if key[0] == "swap":
+            _, qubit1, qubit2 = key
+            states = apply_swap_kernel(states, qubit1, qubit2, qubit_num)
+            continue
+
+        _, target = key
+        matrices = sweep_matrices.get(position)
+
+        if matrices is not None and gate.is_diagonal:
+            states = apply_batched_diagonal_kernel(
+                states,
+                np.diagonal(matrices, axis1=1, axis2=2),
+                target,
+                qubit_num,
+                controls=controls,
+            )
+        elif matrices is not None:
+            states = apply_batched_matrix_kernel(
+                states, matrices, target, qubit_num, controls=controls
+            )
+        elif gate.is_permutation:
+            states = apply_flip_kernel(states, target, qubit_num, controls=controls)
+        elif gate.is_diagonal:
+            states = apply_diagonal_kernel(
+                states, gate.matrix.diagonal(), target, qubit_num, controls=controls
+            )
+        else:
+            states = apply_matrix_kernel(
+                states, gate.matrix, target, qubit_num, controls=controls
+            )
+
+    return states
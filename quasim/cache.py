@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+import json
+import numpy as np
+import os
+from typing import Dict, List, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .gates import IGate
+from .gates.utils import get_gate_key
+from .lru import CacheStatistics, LRUCache
+from .utils import SimulationState
+
+
+def get_prefix_hashes(gates: List[IGate], qubit_num: int) -> List[int]:
+    """Return a hash chain over the gates of a circuit with the specified
+    amount of qubits, where the i-th hash identifies the sequence of the
+    first i + 1 gates."""
+    prefix_hashes = []
+
+    prefix_hash = hash(("prefix", qubit_num))
+    for gate in gates:
+        prefix_hash = hash((prefix_hash, get_gate_key(gate)))
+        prefix_hashes.append(prefix_hash)
+
+    return prefix_hashes
+
+
+class PrefixCache(LRUCache):
+    """Bounded least-recently-used cache of intermediate simulation
+    states, keyed by the hash chain of the gates applied so far.
+
+    Circuits that share a prefix of gates with a previously evaluated
+    circuit can resume from the state after the longest cached prefix
+    instead of starting from |0...0>. While evaluating a circuit, the
+    simulator stores its state every snapshot_interval gates and at
+    the end of the circuit.
+
+    The memory held by the cache is capped at max_bytes. Entries are
+    copied when stored and when restored, so that they are never
+    modified by the simulator.
+    """
+
+    snapshot_interval: int
+    skipped_gates: int
+
+    def __init__(
+        self, max_bytes: int = 256 * 2**20, snapshot_interval: int = 8
+    ) -> None:
+        super().__init__(max_bytes)
+        self.snapshot_interval = snapshot_interval
+        self.skipped_gates = 0
+
+    def lookup(self, prefix_hashes: List[int]) -> Tuple[int, SimulationState]:
+        """Return the length of the longest cached prefix together with
+        a copy of the state after it. If no prefix is cached, a length
+        of 0 and None are returned."""
+        for index in reversed(range(len(prefix_hashes))):
+            simulation_state = self._get(prefix_hashes[index])
+            if simulation_state is not None:
+                self.hits += 1
+                self.skipped_gates += index + 1
+                return index + 1, simulation_state.copy()
+
+        self.misses += 1
+        return 0, None
+
+    def store(self, prefix_hash: int, simulation_state: SimulationState) -> None:
+        """Store a copy of the state after the prefix identified by
+        the specified hash."""
+        if self._can_store(prefix_hash, simulation_state.nbytes):
+            self._store(prefix_hash, simulation_state.copy())
+
+    def clear(self) -> None:
+        """Remove all states and reset the statistics."""
+        super().clear()
+        self.skipped_gates = 0
+
+
+class ResultCache(LRUCache):
+    """Bounded least-recently-used cache of final circuit states, keyed
+    by circuit fingerprints (see Circuit.fingerprint).
+
+    Circuits with equal fingerprints receive the cached state instead
+    of being simulated. Parameters are compared after rounding them to
+    the specified amount of decimals. The memory held by the cache is
+    capped at max_bytes, the number of states at max_entries (if set).
+
+    Cached states are shared between circuits and therefore read-only.
+    """
+
+    decimals: int
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2**20,
+        max_entries: int = None,
+        decimals: int = 8,
+    ) -> None:
+        super().__init__(max_bytes, max_entries=max_entries)
+        self.decimals = decimals
+
+    def lookup(self, fingerprint: str) -> np.ndarray:
+        """Return the state stored under the specified fingerprint,
+        or None if there is none."""
+        state = self._get(fingerprint)
+        if state is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return state
+
+    def store(self, fingerprint: str, state: np.ndarray) -> np.ndarray:
+        """Store a state under the specified fingerprint and return
+        the (read-only) stored state."""
+        if not self._can_store(fingerprint, state.nbytes):
+            return state
+
+        state.flags.writeable = False
+        self._store(fingerprint, state)
+        return state
+
+
+class DiskCache(CacheStatistics):
+    """Persistent cache of final circuit states, keyed by circuit
+    fingerprints (see Circuit.fingerprint).
+
+    All states are stored in a single memory-mapped .npy arena of
+    max_bytes inside the specified directory, next to a JSON index
+    mapping fingerprints onto their position in the arena.
+
+    The arena is filled like a ring buffer: once it is full, new states
+    overwrite (and evict) the oldest ones. Lookups therefore return a
+    copy of the state, which is read while holding the lock, so that
+    later stores (from this or another process) cannot modify it.
+
+    Access from multiple processes is synchronized through a lock file
+    (shared locks for lookups, exclusive locks for stores). On platforms
+    without fcntl, no locking takes place. Every write of the index
+    increments a generation counter, which is kept in a small file next
+    to the index, so that each process only parses the index again once
+    its generation has changed.
+
+    An existing arena is only opened with the capacity it has been
+    created with, since other processes may still be using it.
+    """
+
+    directory: str
+    max_bytes: int
+    decimals: int
+
+    def __init__(
+        self, directory: str, max_bytes: int = 2**30, decimals: int = 8
+    ) -> None:
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.decimals = decimals
+
+        self._arena_path = os.path.join(directory, "states.npy")
+        self._index_path = os.path.join(directory, "index.json")
+        self._generation_path = os.path.join(directory, "generation")
+        self._lock_path = os.path.join(directory, "lock")
+
+        self._arena: np.ndarray = None
+        self._index: Dict = None
+
+        os.makedirs(directory, exist_ok=True)
+        with self._locked(exclusive=True):
+            self._open_arena()
+
+    def __len__(self) -> int:
+        with self._locked(exclusive=False):
+            return len(self._read_index()["entries"])
+
+    def __getstate__(self) -> dict:
+        # Copies of the cache (e.g. in worker processes) reopen the arena.
+        state = self.__dict__.copy()
+        state["_arena"] = None
+        state["_index"] = None
+        return state
+
+    @property
+    def capacity(self) -> int:
+        """Amount of amplitudes the arena can hold."""
+        return self.max_bytes // np.dtype(np.complex128).itemsize
+
+    def lookup(self, fingerprint: str) -> np.ndarray:
+        """Return a copy of the state stored under the specified
+        fingerprint, or None if there is none."""
+        with self._locked(exclusive=False):
+            entry = self._read_index()["entries"].get(fingerprint)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            offset, length = entry
+            state = np.array(self._get_arena()[offset : offset + length])
+
+        self.hits += 1
+        return state
+
+    def store(self, fingerprint: str, state: np.ndarray) -> np.ndarray:
+        """Store a state under the specified fingerprint, evicting the
+        oldest states if the arena is full, and return the state."""
+        if len(state) > self.capacity:
+            return state
+
+        with self._locked(exclusive=True):
+            index = self._read_index()
+            if fingerprint in index["entries"]:
+                return state
+
+            offset = index["head"]
+            if offset + len(state) > self.capacity:
+                offset = 0
+
+            end = offset + len(state)
+            index["entries"] = {
+                entry_fingerprint: (entry_offset, entry_length)
+                for entry_fingerprint, (entry_offset, entry_length) in index[
+                    "entries"
+                ].items()
+                if entry_offset + entry_length <= offset or entry_offset >= end
+            }
+
+            arena = self._get_arena()
+            arena[offset:end] = state
+            arena.flush()
+
+            index["entries"][fingerprint] = (offset, len(state))
+            index["head"] = end
+            self._write_index(index)
+
+        return state
+
+    def clear(self) -> None:
+        """Remove all states and reset the statistics."""
+        with self._locked(exclusive=True):
+            self._write_index({"capacity": self.capacity, "head": 0, "entries": {}})
+
+        self.reset_statistics()
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        with open(self._lock_path, "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open_arena(self) -> None:
+        """Create the arena and an empty index, unless an arena exists
+        already. Requires an exclusive lock."""
+        if os.path.exists(self._arena_path) and os.path.exists(self._index_path):
+            with open(self._index_path) as index_file:
+                capacity = json.load(index_file)["capacity"]
+
+            if capacity != self.capacity:
+                raise ValueError(
+                    f"The disk cache in {self.directory} holds {capacity} "
+                    f"amplitudes instead of {self.capacity}"
+                )
+            return
+
+        arena = np.lib.format.open_memmap(
+            self._arena_path, mode="w+", dtype=np.complex128, shape=(self.capacity,)
+        )
+        arena.flush()
+        del arena
+
+        self._write_index({"capacity": self.capacity, "head": 0, "entries": {}})
+
+    def _get_arena(self) -> np.ndarray:
+        if self._arena is None:
+            self._arena = np.lib.format.open_memmap(self._arena_path, mode="r+")
+        return self._arena
+
+    def _read_generation(self) -> int:
+        """Return the generation of the index on disk. Requires a lock."""
+        try:
+            with open(self._generation_path) as generation_file:
+                return int(generation_file.read())
+        except FileNotFoundError:
+            return 0
+
+    def _read_index(self) -> Dict:
+        """Return the index, which is only read from disk if its
+        generation has changed since it was last read. Requires a lock."""
+        generation = self._read_generation()
+
+        if self._index is None or self._index.get("generation", 0) != generation:
+            with open(self._index_path) as index_file:
+                self._index = json.load(index_file)
+
+        return self._index
+
+    def _write_index(self, index: Dict) -> None:
+        """Atomically replace the index on disk and increment its
+        generation. Requires an exclusive lock."""
+        index["generation"] = self._read_generation() + 1
+
+        # The generation is written first, so that an interrupted write
+        # never leaves two different indices with the same generation.
+        temporary_path = f"{self._generation_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as generation_file:
+            generation_file.write(str(index["generation"]))
+        os.replace(temporary_path, self._generation_path)
+
+        temporary_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as index_file:
+            json.dump(index, index_file)
+        os.replace(temporary_path, self._index_path)
+
+        self._index = None
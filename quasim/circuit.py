@@ -1,20 +1,33 @@
 #!/usr/bin/env python3
 
+import hashlib
 import numpy as np
-from typing import List, Union, Dict
+from typing import List, Union, Dict, Tuple
 
-from .gates import IGate, Swap, Gate, CGate, CCGate, CX
+from .gates import IGate, Swap, Gate, CGate, CCGate, CX, BlockGate, Parameter
 from .gates._matrices import X_MATRIX
+from .parameters import (
+    ParameterValues,
+    bind_gates,
+    get_gate_parameter,
+    get_parameter_values,
+)
+from .sampling import CumulativeSampler, Seed
+from .state import FactorizedState
 from .utils import (
+    SimulationState,
+    counts_from_indices,
     probabilities_from_state,
     probability_dict_from_state,
     state_dict_from_state,
 )
 from .gates.utils import (
-    create_double_controlled_matrix,
-    create_controlled_matrix,
-    create_matrix,
+    get_double_controlled_matrix,
+    get_controlled_matrix,
+    get_matrix,
+    get_block_matrix,
     create_identity,
+    get_gate_fingerprint,
 )
 
 
@@ -27,9 +40,14 @@ class Circuit:
     qubit_num: int
 
     _state: np.ndarray = None
+    _factorized_state: FactorizedState = None
     _probabilities: np.ndarray = None
     _probability_dict: Dict = None
     _state_dict: Dict = None
+    _sampler: CumulativeSampler = None
+
+    _simulation_state: SimulationState = None
+    _simulated_gates: Tuple[IGate, ...] = ()
 
     def __init__(self, qubit_num: int) -> None:
         self.gates = []
@@ -39,22 +57,133 @@ class Circuit:
     def apply(self, gate: IGate) -> None:
         """Appends the specified gate to the list of
         gates already in the circuit."""
-        self._state, self._probabilities = None, None
+        self.set_state(None)
 
         self.gates.append(gate)
 
+    @property
+    def parameter_positions(self) -> List[Tuple[int, Parameter]]:
+        """Returns the positions of all gates with an unbound
+        parameter together with their parameter."""
+        parameter_positions = []
+        for position, gate in enumerate(self.gates):
+            parameter = get_gate_parameter(gate)
+            if parameter is not None:
+                parameter_positions.append((position, parameter))
+        return parameter_positions
+
+    @property
+    def parameters(self) -> List[Parameter]:
+        """Returns the unbound parameters of the circuit in the
+        order in which they first occur."""
+        return list(
+            dict.fromkeys(parameter for _, parameter in self.parameter_positions)
+        )
+
+    def bind(self, values: ParameterValues) -> "Circuit":
+        """Returns a copy of the circuit in which all parameters are
+        bound to the specified values, which are either keyed by
+        parameter or given in the order of Circuit.parameters.
+
+        Only the parameterized gates are copied; all other gates
+        are shared with the bound circuit.
+        """
+        parameter_positions = self.parameter_positions
+        values = get_parameter_values(self.parameters, values)
+
+        circuit = Circuit(self.qubit_num)
+        circuit.gates = bind_gates(self.gates, parameter_positions, values)
+        return circuit
+
+    def copy(self) -> "Circuit":
+        """Returns a copy of the circuit with its own list of gates.
+
+        The simulation state attached to the circuit (if any) is
+        shared with the copy, so that the copy can be evaluated
+        incrementally after further gates have been applied to it.
+        """
+        circuit = Circuit(self.qubit_num)
+        circuit.gates = list(self.gates)
+        circuit.set_state(self._state)
+        circuit._factorized_state = self._factorized_state
+        circuit._simulation_state = self._simulation_state
+        circuit._simulated_gates = self._simulated_gates
+        return circuit
+
     @property
     def state(self) -> Union[np.ndarray, None]:
         """Returns the state of the circuit after all
         quantum gates have been applied.
 
         If the circuit has not been evaluated by the
-        simulator, None is returned.
+        simulator, None is returned. If the simulator left a
+        factorized state, the full state is built from it on
+        first access.
         """
+        if self._state is None and self._factorized_state is not None:
+            self._state = self._factorized_state.to_state()
+
         return self._state
 
+    @property
+    def factorized_state(self) -> Union[FactorizedState, None]:
+        """Returns the state of the circuit after all quantum gates
+        have been applied as a product of the states of its qubit
+        groups, without building the full state.
+
+        If the circuit has not been evaluated by the simulator (or
+        its state has been set directly), None is returned.
+        """
+        return self._factorized_state
+
+    @property
+    def is_evaluated(self) -> bool:
+        """Indicates if a (full or factorized) state is attached to
+        the circuit."""
+        return self._state is not None or self._factorized_state is not None
+
+    @property
+    def simulation_state(self) -> Union[SimulationState, None]:
+        """Returns the factorized state of the simulator after the
+        first simulated_gate_count gates of the circuit, if it has
+        been attached to the circuit during evaluation.
+
+        The simulation state is only returned as long as the first
+        simulated_gate_count gates of the circuit are still the gates
+        that have been simulated, which are compared by identity. Gates
+        that have been removed, replaced, or inserted are detected.
+        """
+        if len(self._simulated_gates) > len(self.gates) or any(
+            gate is not simulated_gate
+            for gate, simulated_gate in zip(self.gates, self._simulated_gates)
+        ):
+            return None
+
+        return self._simulation_state
+
+    @property
+    def simulated_gate_count(self) -> int:
+        return len(self._simulated_gates)
+
+    def set_simulation_state(
+        self, simulation_state: SimulationState, gate_count: int
+    ) -> None:
+        self._simulation_state = simulation_state
+        self._simulated_gates = tuple(self.gates[:gate_count])
+
     def set_state(self, state: np.ndarray) -> None:
         self._state = state
+        self._factorized_state = None
+
+        # Reset all values derived from the previous state.
+        self._probabilities = None
+        self._probability_dict = None
+        self._state_dict = None
+        self._sampler = None
+
+    def set_factorized_state(self, factorized_state: FactorizedState) -> None:
+        self.set_state(None)
+        self._factorized_state = factorized_state
 
     @property
     def probabilities(self) -> Union[np.ndarray, None]:
@@ -66,7 +195,7 @@ class Circuit:
         simulator, None is returned.
         """
 
-        if self._state is None:
+        if self.state is None:
             return None
 
         if self._probabilities is not None:
@@ -86,7 +215,7 @@ class Circuit:
         simulator, None is returned.
         """
 
-        if self._state is None:
+        if self.state is None:
             return None
 
         if self._probability_dict is not None:
@@ -106,7 +235,7 @@ class Circuit:
         simulator, None is returned.
         """
 
-        if self._state is None:
+        if self.state is None:
             return None
 
         if self._state_dict is not None:
@@ -115,6 +244,64 @@ class Circuit:
             self._state_dict = state_dict_from_state(self.state)
             return self._state_dict
 
+    def sample(
+        self,
+        shots: int,
+        seed: Seed = None,
+        output: str = "counts",
+        integer_keys: bool = False,
+    ) -> Union[Dict, np.ndarray, None]:
+        """Draws measurements of all qubits from the state of the
+        circuit after all quantum gates have been applied.
+
+        Returns a dictionary of the amount of occurrences of every
+        measured state (output="counts", keyed by bit string or, if
+        integer_keys is set, by index) or an array of the indices
+        of the measured states (output="indices").
+
+        If only a factorized state is attached to the circuit, the
+        qubit groups are sampled independently without building the
+        full state. Otherwise, the cumulative distribution of the
+        full state is computed once and reused by further calls.
+
+        If the circuit has not been evaluated by the
+        simulator, None is returned.
+        """
+
+        if output not in ("counts", "indices"):
+            raise ValueError(f"Unknown output '{output}'")
+
+        if not self.is_evaluated:
+            return None
+
+        if self._state is None:
+            indices = self._factorized_state.sample_indices(shots, seed=seed)
+        else:
+            if self._sampler is None:
+                self._sampler = CumulativeSampler(self.probabilities)
+            indices = self._sampler.sample(shots, seed=seed)
+
+        if output == "indices":
+            return indices
+
+        return counts_from_indices(indices, self.qubit_num, integer_keys=integer_keys)
+
+    def fingerprint(self, decimals: int = 8) -> str:
+        """Returns a canonical fingerprint of the circuit, which is equal
+        for circuits of the same width whose gates have the same classes,
+        qubits, and parameters (rounded to the specified amount of
+        decimals).
+
+        The fingerprint is a hex digest and therefore stable across
+        processes.
+        """
+        gate_fingerprints = tuple(
+            get_gate_fingerprint(gate, decimals=decimals) for gate in self.gates
+        )
+        return hashlib.sha1(
+            repr((self.qubit_num, gate_fingerprints)).encode()
+        ).hexdigest()
+
     def __repr__(self) -> str:
         return f"[{', '.join([str(gate) for gate in self.gates])}]"
 
@@ -125,39 +312,45 @@ def get_unitary(circuit: Circuit) -> np.ndarray:
 
     unitary = create_identity(dim=2**circuit.qubit_num)
     for gate in circuit.gates:
-        if type(gate) == Swap:
-            cnot1 = create_controlled_matrix(
-                X_MATRIX, gate.qubit1, gate.qubit2, circuit.qubit_num
-            )
-            cnot2 = create_controlled_matrix(
-                X_MATRIX, gate.qubit2, gate.qubit1, circuit.qubit_num
-            )
-
-            unitary = np.matmul(cnot1, unitary)
-            unitary = np.matmul(cnot2, unitary)
-            unitary = np.matmul(cnot1, unitary)
-
-        elif issubclass(gate.__class__, Gate):
-            matrix = create_matrix(gate.matrix, gate.target_qubit, circuit.qubit_num)
-            unitary = np.matmul(matrix, unitary)
-
-        elif issubclass(gate.__class__, CGate):
-            matrix = create_controlled_matrix(
-                gate.matrix, gate.control_qubit, gate.target_qubit, circuit.qubit_num
-            )
-            unitary = np.matmul(matrix, unitary)
-
-        elif issubclass(gate.__class__, CCGate):
-            matrix = create_double_controlled_matrix(
-                gate.matrix,
-                gate.control_qubit1,
-                gate.control_qubit2,
-                gate.target_qubit,
-                circuit.qubit_num,
-            )
-            unitary = np.matmul(matrix, unitary)
-
-        else:
-            raise NotImplementedError(f"Unknown gate type for {gate} ({type(gate)})")
+        unitary = np.matmul(get_operator(gate, circuit.qubit_num), unitary)
 
     return unitary
+
+
+def get_operator(
+    gate: IGate, qubit_num: int, positions: Dict[int, int] = None
+) -> np.ndarray:
+    """Computes the matrix of a gate acting on a register of the
+    specified amount of qubits. If positions are specified, each
+    qubit of the gate is mapped onto its position in the register."""
+    if positions is None:
+        qubits = gate.qubits
+    else:
+        qubits = [positions[qubit] for qubit in gate.qubits]
+
+    if type(gate) == Swap:
+        qubit1, qubit2 = qubits
+        cnot1 = get_controlled_matrix(X_MATRIX, qubit1, qubit2, qubit_num)
+        cnot2 = get_controlled_matrix(X_MATRIX, qubit2, qubit1, qubit_num)
+
+        return np.matmul(cnot1, np.matmul(cnot2, cnot1))
+
+    elif issubclass(gate.__class__, Gate):
+        (target_qubit,) = qubits
+        return get_matrix(gate.matrix, target_qubit, qubit_num)
+
+    elif issubclass(gate.__class__, CGate):
+        target_qubit, control_qubit = qubits
+        return get_controlled_matrix(gate.matrix, control_qubit, target_qubit, qubit_num)
+
+    elif issubclass(gate.__class__, CCGate):
+        target_qubit, control_qubit1, control_qubit2 = qubits
+        return get_double_controlled_matrix(
+            gate.matrix, control_qubit1, control_qubit2, target_qubit, qubit_num
+        )
+
+    elif type(gate) == BlockGate:
+        return get_block_matrix(gate.matrix, qubits, qubit_num)
+
+    else:
+        raise NotImplementedError(f"Unknown gate type for {gate} ({type(gate)})")
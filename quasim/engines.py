@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from .gates import IGate, Gate, CGate, CCGate, BlockGate
+from .kernels import (
+    apply_matrix_kernel,
+    apply_diagonal_kernel,
+    apply_flip_kernel,
+    apply_block_kernel,
+)
+from .utils import QubitGroup, apply_gate, apply_cgate, apply_ccgate, apply_block_gate
+
+
+class IEngine(ABC):
+    """Base class of all engines used by the simulator to
+    evolve the state of a qubit group."""
+
+    @abstractmethod
+    def apply_gate(
+        self, qubit_group: QubitGroup, gate: Gate, positions: Sequence[int]
+    ) -> None:
+        """Apply the action of the specified gate onto the
+        qubit group in place. The positions contain the position
+        of the target qubit within the qubit group."""
+        ...
+
+    @abstractmethod
+    def apply_cgate(
+        self, qubit_group: QubitGroup, gate: CGate, positions: Sequence[int]
+    ) -> None:
+        """Apply the action of the specified controlled gate onto
+        the qubit group in place. The positions contain the positions
+        of the target and control qubit within the qubit group."""
+        ...
+
+    @abstractmethod
+    def apply_ccgate(
+        self, qubit_group: QubitGroup, gate: CCGate, positions: Sequence[int]
+    ) -> None:
+        """Apply the action of the specified double controlled gate
+        onto the qubit group in place. The positions contain the
+        positions of the target and both control qubits within the
+        qubit group."""
+        ...
+
+    @abstractmethod
+    def apply_block_gate(
+        self, qubit_group: QubitGroup, gate: BlockGate, positions: Sequence[int]
+    ) -> None:
+        """Apply the action of the specified block gate onto
+        the qubit group in place. The positions contain the positions
+        of the gate qubits within the qubit group."""
+        ...
+
+
+class MatrixEngine(IEngine):
+    """Reference engine that composes the full 2^n x 2^n operator
+    of every gate and multiplies it with the group state.
+
+    Per gate, time and memory grow with O(4^n), which makes this
+    engine only suitable for small qubit groups or for validating
+    the results of other engines.
+    """
+
+    def apply_gate(
+        self, qubit_group: QubitGroup, gate: Gate, positions: Sequence[int]
+    ) -> None:
+        apply_gate(qubit_group, gate, positions)
+
+    def apply_cgate(
+        self, qubit_group: QubitGroup, gate: CGate, positions: Sequence[int]
+    ) -> None:
+        apply_cgate(qubit_group, gate, positions)
+
+    def apply_ccgate(
+        self, qubit_group: QubitGroup, gate: CCGate, positions: Sequence[int]
+    ) -> None:
+        apply_ccgate(qubit_group, gate, positions)
+
+    def apply_block_gate(
+        self, qubit_group: QubitGroup, gate: BlockGate, positions: Sequence[int]
+    ) -> None:
+        apply_block_gate(qubit_group, gate, positions)
+
+
+class KernelEngine(IEngine):
+    """Engine that applies the 2x2 base matrix of every gate
+    directly to the target axis of the group state, viewed as
+    a tensor of shape (2,) * n. Control qubits are handled by
+    slicing. Diagonal gates are reduced to multiplying the
+    affected amplitudes with phases, permutation gates to
+    exchanging amplitudes along the target axis.
+
+    Per gate, time grows with O(2^n) and no operator is
+    allocated. Block gates on k qubits are applied with a
+    single matrix product, which takes O(2^(n+k)) time.
+    """
+
+    def apply_gate(
+        self, qubit_group: QubitGroup, gate: Gate, positions: Sequence[int]
+    ) -> None:
+        self._apply(qubit_group, gate, positions)
+
+    def apply_cgate(
+        self, qubit_group: QubitGroup, gate: CGate, positions: Sequence[int]
+    ) -> None:
+        self._apply(qubit_group, gate, positions)
+
+    def apply_ccgate(
+        self, qubit_group: QubitGroup, gate: CCGate, positions: Sequence[int]
+    ) -> None:
+        self._apply(qubit_group, gate, positions)
+
+    def apply_block_gate(
+        self, qubit_group: QubitGroup, gate: BlockGate, positions: Sequence[int]
+    ) -> None:
+        qubit_group.state = apply_block_kernel(
+            qubit_group.state,
+            gate.matrix,
+            targets=positions,
+            qubit_num=len(qubit_group.qubits),
+        )
+
+    def _apply(
+        self, qubit_group: QubitGroup, gate: IGate, positions: Sequence[int]
+    ) -> None:
+        target, *controls = positions
+
+        if gate.is_permutation:
+            qubit_group.state = apply_flip_kernel(
+                qubit_group.state,
+                target=target,
+                qubit_num=len(qubit_group.qubits),
+                controls=controls,
+            )
+            return
+
+        if gate.is_diagonal:
+            kernel = apply_diagonal_kernel
+            matrix = gate.matrix.diagonal()
+        else:
+            kernel = apply_matrix_kernel
+            matrix = gate.matrix
+
+        qubit_group.state = kernel(
+            qubit_group.state,
+            matrix,
+            target=target,
+            qubit_num=len(qubit_group.qubits),
+            controls=controls,
+        )
@@ -1,5 +1,7 @@
 from .interface import IGate
+from .parameter import Parameter
 from .swap import Swap
-from .single_qubit_gates import Gate, H, X, Y, Z, RX, RY, RZ, Phase, S, T
+from .single_qubit_gates import Gate, H, X, Y, Z, RX, RY, RZ, Phase, S, T, Unitary
 from .controlled_gates import CGate, CX, CY, CZ, CRX, CRY, CRZ, CH, CS, CPhase
 from .double_controlled_gates import CCGate, CCX, CCZ
+from .block_gate import BlockGate
@@ -44,3 +44,36 @@ def PHASE_MATRIX(theta: float) -> np.ndarray:
         [[1, 0], [0, cmath.exp(1j * theta)]],
         dtype=np.complex128,
     )
+
+
+# Matrices of rotations by an array of angles, of shape (len(thetas), 2, 2).
+
+
+def RX_MATRICES(thetas: np.ndarray) -> np.ndarray:
+    cos, sin = np.cos(thetas / 2), np.sin(thetas / 2)
+    return np.stack(
+        [np.stack([cos, -1j * sin], axis=-1), np.stack([-1j * sin, cos], axis=-1)],
+        axis=-2,
+    ).astype(np.complex128)
+
+
+def RY_MATRICES(thetas: np.ndarray) -> np.ndarray:
+    cos, sin = np.cos(thetas / 2), np.sin(thetas / 2)
+    return np.stack(
+        [np.stack([cos, -sin], axis=-1), np.stack([sin, cos], axis=-1)],
+        axis=-2,
+    ).astype(np.complex128)
+
+
+def RZ_MATRICES(thetas: np.ndarray) -> np.ndarray:
+    matrices = np.zeros((len(thetas), 2, 2), dtype=np.complex128)
+    matrices[:, 0, 0] = np.exp(-1j * thetas / 2)
+    matrices[:, 1, 1] = np.exp(1j * thetas / 2)
+    return matrices
+
+
+def PHASE_MATRICES(thetas: np.ndarray) -> np.ndarray:
+    matrices = np.zeros((len(thetas), 2, 2), dtype=np.complex128)
+    matrices[:, 0, 0] = 1
+    matrices[:, 1, 1] = np.exp(1j * thetas)
+    return matrices
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from typing import List
+
+from .interface import IGate
+
+
+class BlockGate(IGate):
+    """Gate with an arbitrary unitary matrix acting on a block
+    of qubits.
+
+    The matrix has a dimensionality of 2^k for k qubits, where
+    the first of the specified qubits corresponds to the most
+    significant bit. Used to represent products of gates acting
+    on few qubits, e.g. after block fusion. The gate is marked
+    as diagonal if its matrix is."""
+
+    target_qubits: List[int]
+    matrix: np.ndarray
+
+    def __init__(self, qubits: List[int], matrix: np.ndarray) -> None:
+        self.target_qubits = list(qubits)
+        self.matrix = np.asarray(matrix, dtype=np.complex128)
+        self.is_diagonal = bool(
+            np.count_nonzero(self.matrix - np.diag(self.matrix.diagonal())) == 0
+        )
+
+    @property
+    def qubits(self) -> List[int]:
+        return self.target_qubits
+
+    def __repr__(self) -> str:
+        gate_name = str(type(self)).split(".")[-1].replace("'>", "")
+        return f"{gate_name}(qubits={self.target_qubits})"
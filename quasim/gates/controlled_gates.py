@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from typing import List
+from typing import List, Union
 
 from .interface import IGate
+from .parameter import Parameter, get_rotation_matrix
 from ._matrices import (
     H_MATRIX,
     X_MATRIX,
@@ -44,6 +45,7 @@ class CH(CGate):
     if the control_qubit is in a state of |1>.
     """
 
+    is_self_inverse: bool = True
     matrix: np.ndarray = H_MATRIX
 
 
@@ -55,6 +57,7 @@ class CS(CGate):
     The S gate induces a phase of pi/2.
     """
 
+    is_diagonal: bool = True
     matrix: np.ndarray = S_MATRIX
 
 
@@ -65,6 +68,8 @@ class CX(CGate):
     if the control_qubit is in a state of |1>.
     """
 
+    is_permutation: bool = True
+    is_self_inverse: bool = True
     matrix: np.ndarray = X_MATRIX
 
 
@@ -75,6 +80,7 @@ class CY(CGate):
     if the control_qubit is in a state of |1>.
     """
 
+    is_self_inverse: bool = True
     matrix: np.ndarray = Y_MATRIX
 
 
@@ -85,6 +91,8 @@ class CZ(CGate):
     if the control_qubit is in a state of |1>.
     """
 
+    is_diagonal: bool = True
+    is_self_inverse: bool = True
     matrix: np.ndarray = Z_MATRIX
 
 
@@ -97,13 +105,15 @@ class CRX(CGate):
     """
 
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, control_qubit: int, target_qubit: int, theta: float) -> None:
+    def __init__(
+        self, control_qubit: int, target_qubit: int, theta: Union[float, Parameter]
+    ) -> None:
         self.control_qubit = control_qubit
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = RX_MATRIX(theta)
+        self.matrix = get_rotation_matrix(RX_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
@@ -119,13 +129,15 @@ class CRY(CGate):
     """
 
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, control_qubit: int, target_qubit: int, theta: float) -> None:
+    def __init__(
+        self, control_qubit: int, target_qubit: int, theta: Union[float, Parameter]
+    ) -> None:
         self.control_qubit = control_qubit
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = RY_MATRIX(theta)
+        self.matrix = get_rotation_matrix(RY_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
@@ -140,14 +152,17 @@ class CRZ(CGate):
     of |1>.
     """
 
+    is_diagonal: bool = True
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, control_qubit: int, target_qubit: int, theta: float) -> None:
+    def __init__(
+        self, control_qubit: int, target_qubit: int, theta: Union[float, Parameter]
+    ) -> None:
         self.control_qubit = control_qubit
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = RZ_MATRIX(theta)
+        self.matrix = get_rotation_matrix(RZ_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
@@ -161,14 +176,17 @@ class CPhase(CGate):
     if the control_qubit is in a state of |1>.
     """
 
+    is_diagonal: bool = True
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, control_qubit: int, target_qubit: int, theta: float) -> None:
+    def __init__(
+        self, control_qubit: int, target_qubit: int, theta: Union[float, Parameter]
+    ) -> None:
         self.control_qubit = control_qubit
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = PHASE_MATRIX(theta)
+        self.matrix = get_rotation_matrix(PHASE_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
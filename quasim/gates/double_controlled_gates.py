@@ -38,6 +38,8 @@ class CCX(CCGate):
     if both control_qubits are in a state of |1>.
     """
 
+    is_permutation: bool = True
+    is_self_inverse: bool = True
     matrix: np.ndarray = X_MATRIX
 
 
@@ -48,4 +50,6 @@ class CCZ(CCGate):
     if both control_qubits are in a state of |1>.
     """
 
+    is_diagonal: bool = True
+    is_self_inverse: bool = True
     matrix: np.ndarray = Z_MATRIX
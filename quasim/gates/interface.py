@@ -10,6 +10,18 @@ class IGate(ABC):
 
     matrix: np.ndarray
 
+    # Diagonal gates only multiply the amplitudes of a state
+    # with phases and commute with each other.
+    is_diagonal: bool = False
+
+    # Permutation gates only exchange amplitudes of a state
+    # without changing their values.
+    is_permutation: bool = False
+
+    # Self-inverse gates cancel when applied twice in a row
+    # to the same qubits.
+    is_self_inverse: bool = False
+
     @property
     @abstractmethod
     def qubits(self) -> List[int]:
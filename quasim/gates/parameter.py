@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from typing import Callable, Union
+
+
+class Parameter:
+    """Symbolic angle of a rotation gate, which is bound to a value
+    through Circuit.bind or QuaSim.sweep.
+
+    Parameters are compared by identity, so that two parameters
+    with the same name are still distinct. Rounding a parameter
+    returns the parameter itself, so that gates print unbound
+    parameters by name.
+    """
+
+    name: str
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __round__(self, ndigits: int = None) -> "Parameter":
+        return self
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def get_rotation_matrix(
+    matrix_function: Callable[[float], np.ndarray], theta: Union[float, Parameter]
+) -> Union[np.ndarray, None]:
+    """Return the matrix of a rotation by the specified angle, or
+    None if the angle is an unbound parameter."""
+    if isinstance(theta, Parameter):
+        return None
+
+    return matrix_function(theta)
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from typing import List
+from typing import List, Union
 
 from .interface import IGate
+from .parameter import Parameter, get_rotation_matrix
 from ._matrices import (
     H_MATRIX,
     X_MATRIX,
@@ -41,6 +42,7 @@ class S(Gate):
 
     Introduces a phase of pi/2."""
 
+    is_diagonal: bool = True
     matrix: np.ndarray = S_MATRIX
 
 class T(Gate):
@@ -48,30 +50,37 @@ class T(Gate):
 
     Introduces a phase of pi/4."""
 
+    is_diagonal: bool = True
     matrix: np.ndarray = T_MATRIX
 
 
 class H(Gate):
     """Hadamard gate."""
 
+    is_self_inverse: bool = True
     matrix: np.ndarray = H_MATRIX
 
 
 class X(Gate):
     """Pauli-X gate."""
 
+    is_permutation: bool = True
+    is_self_inverse: bool = True
     matrix: np.ndarray = X_MATRIX
 
 
 class Y(Gate):
     """Pauli-Y gate."""
 
+    is_self_inverse: bool = True
     matrix: np.ndarray = Y_MATRIX
 
 
 class Z(Gate):
     """Pauli-Z gate."""
 
+    is_diagonal: bool = True
+    is_self_inverse: bool = True
     matrix: np.ndarray = Z_MATRIX
 
 
@@ -81,12 +90,12 @@ class RX(Gate):
     Performs a rotation by theta/2 degrees around the X axis."""
 
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, target_qubit: int, theta: float) -> None:
+    def __init__(self, target_qubit: int, theta: Union[float, Parameter]) -> None:
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = RX_MATRIX(theta)
+        self.matrix = get_rotation_matrix(RX_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
@@ -99,12 +108,12 @@ class RY(Gate):
     Performs a rotation by theta/2 degrees around the Y axis."""
 
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, target_qubit: int, theta: float) -> None:
+    def __init__(self, target_qubit: int, theta: Union[float, Parameter]) -> None:
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = RY_MATRIX(theta)
+        self.matrix = get_rotation_matrix(RY_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
@@ -116,13 +125,14 @@ class RZ(Gate):
 
     Performs a rotation by theta/2 degrees around the Z axis."""
 
+    is_diagonal: bool = True
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, target_qubit: int, theta: float) -> None:
+    def __init__(self, target_qubit: int, theta: Union[float, Parameter]) -> None:
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = RZ_MATRIX(theta)
+        self.matrix = get_rotation_matrix(RZ_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
@@ -132,14 +142,33 @@ class RZ(Gate):
 class Phase(Gate):
     """Phase gate."""
 
+    is_diagonal: bool = True
     matrix: np.ndarray
-    theta: float
+    theta: Union[float, Parameter]
 
-    def __init__(self, target_qubit: int, theta: float) -> None:
+    def __init__(self, target_qubit: int, theta: Union[float, Parameter]) -> None:
         self.target_qubit = target_qubit
         self.theta = theta
-        self.matrix = PHASE_MATRIX(theta)
+        self.matrix = get_rotation_matrix(PHASE_MATRIX, theta)
 
     def __repr__(self) -> str:
         gate_name = str(type(self)).split(".")[-1].replace("'>", "")
         return f"{gate_name}(target={self.target_qubit}, theta={round(self.theta, 3)})"
+
+
+class Unitary(Gate):
+    """Single qubit gate with an arbitrary unitary matrix.
+
+    Used to represent products of single qubit gates, e.g. after
+    gate fusion. The gate is marked as diagonal if its matrix is."""
+
+    matrix: np.ndarray
+
+    def __init__(self, target_qubit: int, matrix: np.ndarray) -> None:
+        self.target_qubit = target_qubit
+        self.matrix = np.asarray(matrix, dtype=np.complex128)
+        self.is_diagonal = bool(self.matrix[0, 1] == 0 and self.matrix[1, 0] == 0)
+
+    def __repr__(self) -> str:
+        gate_name = str(type(self)).split(".")[-1].replace("'>", "")
+        return f"{gate_name}(target={self.target_qubit}, matrix={np.round(self.matrix, 3).tolist()})"
@@ -11,6 +11,8 @@ class Swap(IGate):
     """Swap gate.
     Swaps the states of the two specified qubits."""
 
+    is_permutation: bool = True
+    is_self_inverse: bool = True
     qubit1: int
     qubit2: int
 
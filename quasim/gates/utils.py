@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 
+from functools import lru_cache
+import inspect
 import numpy as np
-from typing import List
+from typing import Callable, Hashable, List, Tuple
+
+from .interface import IGate
+from ..lru import LRUCache
 
 
 def create_identity(dim: int = 2) -> np.ndarray:
@@ -170,3 +175,271 @@ def create_double_controlled_matrix(
 
     matrix = control_matrix00 + control_matrix01 + control_matrix10 + target_matrix
     return matrix
+
+
+def create_block_matrix(
+    base_matrix: np.ndarray, target_qubits: List[int], qubit_num: int
+) -> np.ndarray:
+    """Creates a composed matrix for a base matrix acting on
+    multiple (not necessarily adjacent) target qubits, the first
+    of which corresponds to the most significant bit of the base
+    matrix.
+    """
+
+    other_qubits = [qubit for qubit in range(qubit_num) if qubit not in target_qubits]
+    matrix = np.kron(base_matrix, create_identity(dim=2 ** len(other_qubits)))
+
+    # Move the axes of the target qubits to their positions.
+    axes = np.argsort(list(target_qubits) + other_qubits)
+    tensor = matrix.reshape((2,) * (2 * qubit_num))
+    tensor = tensor.transpose(list(axes) + [qubit_num + axis for axis in axes])
+
+    return tensor.reshape(2**qubit_num, 2**qubit_num)
+
+
+class OperatorCache(LRUCache):
+    """Bounded least-recently-used cache of composed gate operators.
+
+    Operators are keyed by the bytes of their base matrix, the
+    positions of the qubits they act on, and the size of the qubit
+    group, so that equal operators are only composed once. The
+    memory held by the cache is capped at max_bytes; operators that
+    exceed the cap on their own are never cached.
+
+    Cached operators are returned read-only, since they are shared
+    between all callers.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20) -> None:
+        super().__init__(max_bytes)
+
+    def get(self, key: Hashable, create: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the operator stored under the specified key. On a miss,
+        the operator is created by calling create and stored in the cache.
+        """
+        operator = self._get(key)
+        if operator is not None:
+            self.hits += 1
+            return operator
+
+        self.misses += 1
+        operator = create()
+        operator.flags.writeable = False
+
+        if self._can_store(key, operator.nbytes):
+            self._store(key, operator)
+
+        return operator
+
+
+# Cache shared by the simulator and get_unitary.
+OPERATOR_CACHE = OperatorCache()
+
+
+def get_matrix(
+    base_matrix: np.ndarray, target_qubit: int, qubit_num: int
+) -> np.ndarray:
+    """Cached version of create_matrix."""
+    key = ("matrix", base_matrix.tobytes(), target_qubit, qubit_num)
+
+    # For single qubit groups, create_matrix returns the base matrix
+    # itself, which must not be made read-only by the cache.
+    return OPERATOR_CACHE.get(
+        key, lambda: create_matrix(base_matrix, target_qubit, qubit_num).copy()
+    )
+
+
+def get_controlled_matrix(
+    base_matrix: np.ndarray, control_qubit: int, target_qubit: int, qubit_num: int
+) -> np.ndarray:
+    """Cached version of create_controlled_matrix."""
+    key = (
+        "controlled",
+        base_matrix.tobytes(),
+        control_qubit,
+        target_qubit,
+        qubit_num,
+    )
+    return OPERATOR_CACHE.get(
+        key,
+        lambda: create_controlled_matrix(
+            base_matrix, control_qubit, target_qubit, qubit_num
+        ),
+    )
+
+
+def get_double_controlled_matrix(
+    base_matrix: np.ndarray,
+    control_qubit1: int,
+    control_qubit2: int,
+    target_qubit: int,
+    qubit_num: int,
+) -> np.ndarray:
+    """Cached version of create_double_controlled_matrix."""
+    key = (
+        "double_controlled",
+        base_matrix.tobytes(),
+        control_qubit1,
+        control_qubit2,
+        target_qubit,
+        qubit_num,
+    )
+    return OPERATOR_CACHE.get(
+        key,
+        lambda: create_double_controlled_matrix(
+            base_matrix, control_qubit1, control_qubit2, target_qubit, qubit_num
+        ),
+    )
+
+
+def get_block_matrix(
+    base_matrix: np.ndarray, target_qubits: List[int], qubit_num: int
+) -> np.ndarray:
+    """Cached version of create_block_matrix."""
+    key = ("block", base_matrix.tobytes(), tuple(target_qubits), qubit_num)
+    return OPERATOR_CACHE.get(
+        key, lambda: create_block_matrix(base_matrix, target_qubits, qubit_num)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_argument_names(gate_class: type) -> Tuple[str, ...]:
+    """Return the names of the arguments expected by the
+    constructor of a gate class."""
+    parameters = inspect.signature(gate_class.__init__).parameters
+    return tuple(name for name in parameters if name != "self")
+
+
+def get_gate_arguments(gate: IGate) -> Tuple:
+    """Return the arguments a gate has been constructed with, so that
+    type(gate)(*get_gate_arguments(gate)) creates an equal gate.
+
+    The arguments are read from the gate attributes named after the
+    constructor arguments.
+    """
+    return tuple(getattr(gate, name) for name in get_argument_names(type(gate)))
+
+
+def has_instance_matrix(gate: IGate) -> bool:
+    """Indicate if the matrix of a gate is set on the gate itself rather
+    than fixed by its class, either by its constructor (e.g. rotations)
+    or afterwards (e.g. by create_equivalent_cgate). In the latter case,
+    the constructor arguments do not determine the gate."""
+    matrix = getattr(gate, "matrix", None)
+    return matrix is not None and matrix is not getattr(type(gate), "matrix", None)
+
+
+def get_gate_key(gate: IGate) -> Hashable:
+    """Return a hashable key that is equal for gates of the same class
+    constructed with the same arguments. If the arguments cannot be
+    determined, the key is based on the qubits and matrix of the gate.
+    Matrices set on the gate itself are included in the key, since the
+    arguments do not determine them (see has_instance_matrix).
+    """
+    try:
+        arguments = get_gate_arguments(gate)
+    except AttributeError:
+        return type(gate), tuple(gate.qubits), gate.matrix.tobytes()
+
+    key = type(gate), tuple(_as_hashable(argument) for argument in arguments)
+    if has_instance_matrix(gate):
+        key += (gate.matrix.tobytes(),)
+
+    return key
+
+
+def _as_hashable(argument) -> Hashable:
+    """Convert matrices and qubit lists into hashable values."""
+    if isinstance(argument, np.ndarray):
+        return argument.tobytes()
+    elif isinstance(argument, list):
+        return tuple(argument)
+    else:
+        return argument
+
+
+# Names of constructor arguments that denote qubits rather than parameters.
+QUBIT_ARGUMENT_NAMES = (
+    "target_qubit",
+    "control_qubit",
+    "control_qubit1",
+    "control_qubit2",
+    "qubit1",
+    "qubit2",
+    "qubits",
+)
+
+
+def round_parameter(value, decimals: int):
+    """Round a gate parameter (a number or an array) to the specified
+    amount of decimals, mapping -0.0 onto 0.0."""
+    if isinstance(value, np.ndarray):
+        return tuple((np.round(value, decimals) + 0.0).ravel().tolist())
+    elif isinstance(value, complex):
+        return complex(
+            round(value.real, decimals) + 0.0, round(value.imag, decimals) + 0.0
+        )
+    elif isinstance(value, float):
+        return round(value, decimals) + 0.0
+    else:
+        return value
+
+
+def get_gate_fingerprint(gate: IGate, decimals: int = 8) -> Tuple:
+    """Return a canonical fingerprint of a gate, consisting of its class
+    name, its qubits, and its parameters rounded to the specified amount
+    of decimals.
+
+    Qubits whose order does not affect the action of the gate are
+    sorted: the qubits of swap gates, the control qubits of double
+    controlled gates, and all qubits of controlled phase gates (CZ, CS,
+    CPhase, CCZ), which are symmetric in their qubits. Matrices set on
+    the gate itself are included among the parameters (see
+    has_instance_matrix). Unbound parameters are identified by their
+    name.
+    """
+    gate_class = type(gate)
+    class_name = f"{gate_class.__module__}.{gate_class.__qualname__}"
+
+    try:
+        argument_names = get_argument_names(gate_class)
+        arguments = get_gate_arguments(gate)
+    except AttributeError:
+        return (
+            class_name,
+            tuple(gate.qubits),
+            round_parameter(gate.matrix, decimals),
+        )
+
+    qubits, parameters = {}, []
+    for name, argument in zip(argument_names, arguments):
+        if name in QUBIT_ARGUMENT_NAMES:
+            qubits[name] = argument
+        else:
+            parameters.append(round_parameter(argument, decimals))
+
+    if has_instance_matrix(gate):
+        parameters.append(round_parameter(gate.matrix, decimals))
+
+    # Gates with unbound parameters have no matrix yet, so their qubits
+    # are kept in order.
+    is_symmetric = (
+        len(qubits) > 1
+        and gate.is_diagonal
+        and gate.matrix is not None
+        and all(value == 1 for value in gate.matrix.diagonal()[:-1])
+    )
+
+    if is_symmetric or "qubit1" in qubits:
+        qubits = tuple(sorted(qubits.values()))
+    elif "control_qubit1" in qubits:
+        qubits = (
+            qubits["target_qubit"],
+            *sorted((qubits["control_qubit1"], qubits["control_qubit2"])),
+        )
+    elif "qubits" in qubits:
+        qubits = tuple(qubits["qubits"])
+    else:
+        qubits = tuple(qubits.values())
+
+    return class_name, qubits, tuple(parameters)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+
+from functools import lru_cache
+import numpy as np
+from typing import Sequence, Tuple
+
+
+# All kernels operate on states of shape (..., 2^n), so that a batch of
+# states can be evolved at once.
+
+
+def _as_tensor(state: np.ndarray, qubit_num: int) -> np.ndarray:
+    """View the last axis of a state as tensor of shape (2,) * qubit_num."""
+    return state.reshape(state.shape[:-1] + (2,) * qubit_num)
+
+
+def _broadcastable(coefficients: np.ndarray, qubit_num: int) -> np.ndarray:
+    """Append one axis per qubit to per-state coefficients so that they
+    broadcast against a state tensor."""
+    return coefficients.reshape(coefficients.shape + (1,) * qubit_num)
+
+
+def _target_indices(
+    target: int, qubit_num: int, controls: Sequence[int] = ()
+) -> Tuple[Tuple[slice, ...], Tuple[slice, ...]]:
+    """Return the indices selecting the |0> and |1> halves of the
+    target axis of a state tensor, restricted to the part of the
+    state where all control qubits are in |1>.
+
+    Slices are used instead of integers so that indexing always
+    returns views into the state tensor.
+    """
+    index = [Ellipsis] + [slice(None)] * qubit_num
+    for control in controls:
+        index[control + 1] = slice(1, 2)
+
+    index[target + 1] = slice(0, 1)
+    index0 = tuple(index)
+
+    index[target + 1] = slice(1, 2)
+    index1 = tuple(index)
+
+    return index0, index1
+
+
+def apply_matrix_kernel(
+    state: np.ndarray,
+    matrix: np.ndarray,
+    target: int,
+    qubit_num: int,
+    controls: Sequence[int] = (),
+) -> np.ndarray:
+    """Apply a 2x2 matrix to the target axis of a state in place.
+
+    The state is viewed as a tensor of shape (2,) * qubit_num, so
+    that the matrix only has to act on pairs of amplitudes along
+    the target axis. Controls are handled by restricting the update
+    to the slice in which all control qubits are in |1>. Neither
+    the full 2^n x 2^n operator nor a copy of the state is created.
+
+    The updated state is returned, since reshaping a non-contiguous
+    state cannot be done without a copy.
+    """
+    tensor = _as_tensor(state, qubit_num)
+    index0, index1 = _target_indices(target, qubit_num, controls)
+
+    amplitudes0 = tensor[index0]
+    amplitudes1 = tensor[index1]
+
+    updated_amplitudes0 = matrix[0, 0] * amplitudes0 + matrix[0, 1] * amplitudes1
+
+    amplitudes1 *= matrix[1, 1]
+    amplitudes1 += matrix[1, 0] * amplitudes0
+
+    amplitudes0[...] = updated_amplitudes0
+
+    return tensor.reshape(state.shape)
+
+
+def apply_diagonal_kernel(
+    state: np.ndarray,
+    diagonal: np.ndarray,
+    target: int,
+    qubit_num: int,
+    controls: Sequence[int] = (),
+) -> np.ndarray:
+    """Apply a diagonal 2x2 matrix, specified by its diagonal,
+    to the target axis of a state in place.
+
+    Since diagonal matrices do not mix amplitudes, the action
+    reduces to multiplying both halves of the target axis with
+    a phase. Multiplications with a phase of 1 are skipped.
+    """
+    tensor = _as_tensor(state, qubit_num)
+    index0, index1 = _target_indices(target, qubit_num, controls)
+
+    if diagonal[0] != 1:
+        amplitudes0 = tensor[index0]
+        amplitudes0 *= diagonal[0]
+
+    if diagonal[1] != 1:
+        amplitudes1 = tensor[index1]
+        amplitudes1 *= diagonal[1]
+
+    return tensor.reshape(state.shape)
+
+
+def apply_flip_kernel(
+    state: np.ndarray,
+    target: int,
+    qubit_num: int,
+    controls: Sequence[int] = (),
+) -> np.ndarray:
+    """Flip the target axis of a state in place, which corresponds
+    to the action of a (controlled) Pauli-X gate.
+
+    Only the amplitudes in which all control qubits are in |1> are
+    exchanged. A temporary copy is required for only one half of
+    the exchanged amplitudes.
+    """
+    tensor = _as_tensor(state, qubit_num)
+    index0, index1 = _target_indices(target, qubit_num, controls)
+
+    amplitudes0 = tensor[index0]
+    amplitudes1 = tensor[index1]
+
+    previous_amplitudes0 = amplitudes0.copy()
+    amplitudes0[...] = amplitudes1
+    amplitudes1[...] = previous_amplitudes0
+
+    return tensor.reshape(state.shape)
+
+
+def apply_swap_kernel(
+    state: np.ndarray, qubit1: int, qubit2: int, qubit_num: int
+) -> np.ndarray:
+    """Swap two axes of a state in place.
+
+    Only the amplitudes in which both qubits differ are exchanged,
+    so a temporary copy is required for one quarter of the state.
+    Where possible, the simulator avoids this kernel altogether by
+    relabeling the qubits of a qubit group instead.
+    """
+    tensor = _as_tensor(state, qubit_num)
+
+    index01 = [Ellipsis] + [slice(None)] * qubit_num
+    index01[qubit1 + 1], index01[qubit2 + 1] = slice(0, 1), slice(1, 2)
+
+    index10 = [Ellipsis] + [slice(None)] * qubit_num
+    index10[qubit1 + 1], index10[qubit2 + 1] = slice(1, 2), slice(0, 1)
+
+    amplitudes01 = tensor[tuple(index01)]
+    amplitudes10 = tensor[tuple(index10)]
+
+    previous_amplitudes01 = amplitudes01.copy()
+    amplitudes01[...] = amplitudes10
+    amplitudes10[...] = previous_amplitudes01
+
+    return tensor.reshape(state.shape)
+
+
+def apply_block_kernel(
+    state: np.ndarray,
+    matrix: np.ndarray,
+    targets: Sequence[int],
+    qubit_num: int,
+) -> np.ndarray:
+    """Apply a 2^k x 2^k matrix to k target axes of a state, the first
+    of which corresponds to the most significant bit of the matrix.
+
+    The matrix is viewed as a tensor of shape (2,) * 2k and contracted
+    with the target axes of the state tensor, so that all gates fused
+    into the matrix are applied in a single pass over the state.
+    Diagonal matrices are reduced to multiplying the state with their
+    diagonal. Unlike the other kernels, the state is not updated in
+    place.
+    """
+    tensor = _as_tensor(state, qubit_num)
+
+    block_num = len(targets)
+    batch_dims = tensor.ndim - qubit_num
+    axes = [target + batch_dims for target in targets]
+
+    if np.count_nonzero(matrix - np.diag(matrix.diagonal())) == 0:
+        # Order the axes of the diagonal like the target axes.
+        order = np.argsort(targets)
+        diagonal = matrix.diagonal().reshape((2,) * block_num).transpose(order)
+
+        shape = [1] * tensor.ndim
+        for axis in axes:
+            shape[axis] = 2
+
+        return (tensor * diagonal.reshape(shape)).reshape(state.shape)
+
+    matrix_tensor = matrix.reshape((2,) * (2 * block_num))
+    updated_tensor = np.tensordot(
+        matrix_tensor, tensor, axes=(list(range(block_num, 2 * block_num)), axes)
+    )
+    updated_tensor = np.moveaxis(updated_tensor, list(range(block_num)), axes)
+
+    return np.ascontiguousarray(updated_tensor).reshape(state.shape)
+
+
+def pauli_expectation_kernel(
+    state: np.ndarray,
+    flips: Sequence[int],
+    signs: Sequence[int],
+    qubit_num: int,
+) -> np.ndarray:
+    """Return the expectation value of a Pauli string in a state, where
+    X acts on the flip axes, Z on the sign axes, and Y on the axes in
+    both (up to the phase of Y = iXZ).
+
+    The Pauli string maps each basis state |b> onto a basis state with
+    the flip axes inverted, multiplied with a sign for every set sign
+    axis. The expectation value is therefore the sum over the products
+    of the amplitudes with the conjugated amplitudes of the flipped
+    state, which is a view of the state tensor. The sum is reduced
+    axis by axis, subtracting the |1> from the |0> half on sign axes,
+    so that neither the operator nor a sign mask is created.
+    """
+    tensor = _as_tensor(state, qubit_num)
+    batch_dims = tensor.ndim - qubit_num
+
+    flipped_tensor = np.flip(tensor, axis=[flip + batch_dims for flip in flips])
+    products = flipped_tensor.conj() * tensor
+
+    signs = set(signs)
+    for axis in range(qubit_num - 1, -1, -1):
+        if axis in signs:
+            products = products[..., 0] - products[..., 1]
+        else:
+            products = products[..., 0] + products[..., 1]
+
+    y_count = len(signs.intersection(flips))
+    return products * 1j**y_count
+
+
+def apply_batched_diagonal_kernel(
+    states: np.ndarray,
+    diagonals: np.ndarray,
+    target: int,
+    qubit_num: int,
+    controls: Sequence[int] = (),
+) -> np.ndarray:
+    """Apply one diagonal 2x2 matrix per state, specified by diagonals
+    of shape (batch, 2), to the target axis of a batch of states of
+    shape (batch, 2^n) in place. Control qubits are shared by all
+    states."""
+    tensor = _as_tensor(states, qubit_num)
+    index0, index1 = _target_indices(target, qubit_num, controls)
+
+    amplitudes0 = tensor[index0]
+    amplitudes0 *= _broadcastable(diagonals[:, 0], qubit_num)
+
+    amplitudes1 = tensor[index1]
+    amplitudes1 *= _broadcastable(diagonals[:, 1], qubit_num)
+
+    return tensor.reshape(states.shape)
+
+
+def matrix_element_kernel(
+    bra: np.ndarray,
+    ket: np.ndarray,
+    matrix: np.ndarray,
+    target: int,
+    qubit_num: int,
+    controls: Sequence[int] = (),
+) -> complex:
+    """Return the matrix element <bra| M |ket>, where M acts as the 2x2
+    matrix on the target axis wherever all control qubits are in |1>,
+    and as 0 elsewhere.
+
+    Both states are viewed as tensors and only the slices in which the
+    controls are active are read, so that neither M nor M |ket> is
+    created for the full state.
+    """
+    bra_tensor = _as_tensor(bra, qubit_num)
+    ket_tensor = _as_tensor(ket, qubit_num)
+    index0, index1 = _target_indices(target, qubit_num, controls)
+
+    ket_amplitudes0 = ket_tensor[index0]
+    ket_amplitudes1 = ket_tensor[index1]
+
+    element = 0j
+    for row, index in enumerate((index0, index1)):
+        if matrix[row, 0] == 0 and matrix[row, 1] == 0:
+            continue
+
+        updated_amplitudes = (
+            matrix[row, 0] * ket_amplitudes0 + matrix[row, 1] * ket_amplitudes1
+        )
+        element += np.vdot(bra_tensor[index], updated_amplitudes)
+
+    return complex(element)
+
+
+@lru_cache(maxsize=None)
+def get_control_mask(
+    target: int, controls: Tuple[int, ...], qubit_num: int
+) -> np.ndarray:
+    """Return a boolean mask over the |0> half of the target axis of a
+    state tensor, which is set wherever all control qubits are in |1>.
+    The mask has the shape of tensor[index0], i.e. a length of 1 along
+    the target axis."""
+    tensor_index = np.indices((2,) * qubit_num)
+
+    mask = np.ones((2,) * qubit_num, dtype=bool)
+    for control in controls:
+        mask &= tensor_index[control] == 1
+
+    mask = mask[_target_indices(target, qubit_num)[0]]
+    mask.flags.writeable = False
+    return mask
+
+
+def apply_batched_matrix_kernel(
+    states: np.ndarray,
+    matrices: np.ndarray,
+    target: int,
+    qubit_num: int,
+    control_masks: np.ndarray = None,
+    controls: Sequence[int] = (),
+) -> np.ndarray:
+    """Apply one 2x2 matrix per state to the target axis of a batch of
+    states of shape (batch, 2^n) in place.
+
+    If the states differ in their control qubits, controls are
+    specified as one mask per state (see get_control_mask). Where the
+    mask of a state is not set, the identity is applied instead.
+    Control qubits shared by all states are specified as controls,
+    which restricts the update to the slice in which they are in |1>.
+    """
+    tensor = _as_tensor(states, qubit_num)
+    index0, index1 = _target_indices(target, qubit_num, controls)
+
+    amplitudes0 = tensor[index0]
+    amplitudes1 = tensor[index1]
+
+    matrix00, matrix01, matrix10, matrix11 = (
+        _broadcastable(matrices[:, row, column], qubit_num)
+        for row, column in ((0, 0), (0, 1), (1, 0), (1, 1))
+    )
+
+    updated_amplitudes0 = matrix00 * amplitudes0 + matrix01 * amplitudes1
+    updated_amplitudes1 = matrix10 * amplitudes0 + matrix11 * amplitudes1
+
+    if control_masks is not None:
+        updated_amplitudes0 = np.where(control_masks, updated_amplitudes0, amplitudes0)
+        updated_amplitudes1 = np.where(control_masks, updated_amplitudes1, amplitudes1)
+
+    amplitudes0[...] = updated_amplitudes0
+    amplitudes1[...] = updated_amplitudes1
+
+    return tensor.reshape(states.shape)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class CacheStatistics:
+    """Hit and miss counters of a cache."""
+
+    hits: int
+    misses: int
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that could be served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def reset_statistics(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+
+class LRUCache(CacheStatistics):
+    """Bounded least-recently-used mapping of keys onto entries, which
+    report their size through an nbytes attribute (e.g. arrays).
+
+    The memory held by the cache is capped at max_bytes, the number of
+    entries at max_entries (if set). Copies of the cache (e.g. in
+    worker processes) start empty.
+    """
+
+    max_bytes: int
+    max_entries: int
+    nbytes: int
+
+    def __init__(self, max_bytes: int, max_entries: int = None) -> None:
+        super().__init__()
+        self._entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_entries"] = OrderedDict()
+        state["nbytes"] = 0
+        return state
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the memory cap of the cache and evict entries
+        if necessary."""
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        self._entries.clear()
+        self.nbytes = 0
+        self.reset_statistics()
+
+    def _get(self, key: Hashable) -> Any:
+        """Return the entry stored under a key and mark it as recently
+        used, or return None. Hits and misses are counted by the caller."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _can_store(self, key: Hashable, nbytes: int) -> bool:
+        """Indicate if an entry of the specified size would be stored
+        under a key. Entries exceeding max_bytes on their own are never
+        stored, and stored entries are not replaced."""
+        return key not in self._entries and nbytes <= self.max_bytes
+
+    def _store(self, key: Hashable, entry: Any) -> None:
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes or (
+            self.max_entries is not None and len(self._entries) > self.max_entries
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
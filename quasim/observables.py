@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from typing import Dict, List, Union
+
+from .circuit import Circuit
+from .state import FactorizedState
+from .utils import QubitGroup
+
+# A Pauli string is either given as a string with one Pauli ("I", "X",
+# "Y", or "Z") per qubit, where the first character corresponds to
+# qubit 0, or as a dictionary of the Paulis acting on each qubit.
+Observable = Union[str, Dict[int, str]]
+
+PAULIS = ("I", "X", "Y", "Z")
+
+
+def parse_pauli_string(observable: Observable, qubit_num: int) -> Dict[int, str]:
+    """Returns the Paulis of a Pauli string acting on a register of
+    the specified amount of qubits, keyed by qubit. Identities are
+    omitted."""
+    if isinstance(observable, str):
+        if len(observable) != qubit_num:
+            raise ValueError(
+                f"Pauli string '{observable}' does not act on {qubit_num} qubits"
+            )
+        observable = dict(enumerate(observable))
+
+    pauli_string = {}
+    for qubit, pauli in observable.items():
+        if pauli not in PAULIS:
+            raise ValueError(f"Unknown Pauli '{pauli}'")
+        if not 0 <= qubit < qubit_num:
+            raise ValueError(f"Qubit {qubit} is out of range")
+
+        if pauli != "I":
+            pauli_string[qubit] = pauli
+
+    return pauli_string
+
+
+def expectation(
+    circuit: Circuit, observables: Union[Observable, List[Observable]]
+) -> Union[float, np.ndarray]:
+    """Returns the expectation values of Pauli strings in the state
+    of an evaluated circuit. If a list of Pauli strings is specified,
+    an array with one expectation value per Pauli string is returned.
+
+    The expectation values are computed from the factorized state of
+    the circuit, so that each Pauli string is only evaluated on the
+    qubit groups it acts on. If only the full state is attached to the
+    circuit, it is treated as a single qubit group. Per qubit group
+    and Pauli string, O(2^n) time is required.
+    """
+    if not circuit.is_evaluated:
+        raise ValueError("The circuit has not been evaluated")
+
+    factorized_state = circuit.factorized_state
+    if factorized_state is None:
+        factorized_state = FactorizedState(
+            [QubitGroup(qubits=list(range(circuit.qubit_num)), state=circuit.state)],
+            circuit.qubit_num,
+        )
+
+    if isinstance(observables, (str, dict)):
+        pauli_string = parse_pauli_string(observables, circuit.qubit_num)
+        return factorized_state.expectation(pauli_string)
+
+    return np.array(
+        [
+            factorized_state.expectation(
+                parse_pauli_string(observable, circuit.qubit_num)
+            )
+            for observable in observables
+        ]
+    )
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+import math
+from typing import Dict, List, Tuple, Union
+
+from .circuit import Circuit, get_operator
+from .gates import (
+    IGate,
+    Gate,
+    CGate,
+    Unitary,
+    BlockGate,
+    Z,
+    S,
+    T,
+    RX,
+    RY,
+    RZ,
+    Phase,
+    CZ,
+    CS,
+    CRX,
+    CRY,
+    CRZ,
+    CPhase,
+)
+from .gates.utils import get_gate_fingerprint
+from .parameters import get_gate_parameter
+
+
+# Rotation gates acting on the same qubits are merged by adding their
+# angles. Gates with a fixed phase belong to the family of the phase
+# gate and are merged with it.
+ROTATION_FAMILIES: Dict[type, type] = {
+    RX: RX,
+    RY: RY,
+    RZ: RZ,
+    Phase: Phase,
+    Z: Phase,
+    S: Phase,
+    T: Phase,
+    CRX: CRX,
+    CRY: CRY,
+    CRZ: CRZ,
+    CPhase: CPhase,
+    CZ: CPhase,
+    CS: CPhase,
+}
+
+FIXED_ANGLES: Dict[type, float] = {
+    Z: math.pi,
+    S: math.pi / 2,
+    T: math.pi / 4,
+    CZ: math.pi,
+    CS: math.pi / 2,
+}
+
+# Angles after which the gates of a family act as the identity.
+# Rotations by 2 pi yield -I, which is only a global phase for
+# uncontrolled gates, so a period of 4 pi is used for all of them.
+ROTATION_PERIODS: Dict[type, float] = {
+    RX: 4 * math.pi,
+    RY: 4 * math.pi,
+    RZ: 4 * math.pi,
+    Phase: 2 * math.pi,
+    CRX: 4 * math.pi,
+    CRY: 4 * math.pi,
+    CRZ: 4 * math.pi,
+    CPhase: 2 * math.pi,
+}
+
+ANGLE_TOLERANCE = 1e-10
+
+
+@dataclass
+class OptimizationReport:
+    """Summary of the gates removed by the optimizer."""
+
+    original_gate_count: int = 0
+    optimized_gate_count: int = 0
+
+    # Gates removed because they cancelled each other.
+    cancelled_gates: int = 0
+
+    # Gates removed because they were merged into a preceding gate.
+    merged_gates: int = 0
+
+    # Rotations removed because their angle amounts to the identity.
+    identity_gates: int = 0
+
+    # Single qubit gates removed because they were fused into a
+    # preceding single qubit gate.
+    fused_gates: int = 0
+
+    # Gates removed because they were fused into a block gate.
+    blocked_gates: int = 0
+
+    @property
+    def removed_gates(self) -> int:
+        return self.original_gate_count - self.optimized_gate_count
+
+    def __add__(self, other: "OptimizationReport") -> "OptimizationReport":
+        return OptimizationReport(
+            original_gate_count=self.original_gate_count + other.original_gate_count,
+            optimized_gate_count=self.optimized_gate_count + other.optimized_gate_count,
+            cancelled_gates=self.cancelled_gates + other.cancelled_gates,
+            merged_gates=self.merged_gates + other.merged_gates,
+            identity_gates=self.identity_gates + other.identity_gates,
+            fused_gates=self.fused_gates + other.fused_gates,
+            blocked_gates=self.blocked_gates + other.blocked_gates,
+        )
+
+    def chain(self, other: "OptimizationReport") -> "OptimizationReport":
+        """Combine the report with the report of a pass that has been
+        applied to the optimized gates afterwards."""
+        report = self + other
+        report.original_gate_count = self.original_gate_count
+        report.optimized_gate_count = other.optimized_gate_count
+        return report
+
+
+def optimize_gates(
+    gates: List[IGate],
+) -> Tuple[List[IGate], OptimizationReport]:
+    """Rewrite a list of gates into an equivalent, shorter list of gates
+    through peephole optimizations and return it together with a report.
+
+    Each gate is moved backwards past all preceding gates it commutes
+    with, i.e. gates acting on other qubits and, if it is diagonal,
+    diagonal gates. If it reaches a gate on the same qubits which it
+    can be combined with, both are replaced by their combination:
+    self-inverse gates (e.g. X, H, CX, Swap) cancel, and rotations (RX,
+    RY, RZ, phase gates and their controlled variants) are merged by
+    adding their angles. Merged gates are themselves moved further
+    back, so that chains of gates collapse completely.
+
+    The resulting gates produce exactly the same state, including its
+    global phase.
+    """
+    report = OptimizationReport(original_gate_count=len(gates))
+
+    optimized_gates: List[Union[IGate, None]] = []
+    for gate in gates:
+        if _is_identity(gate):
+            report.identity_gates += 1
+            continue
+
+        optimized_gates.append(None)
+        _place_gate(optimized_gates, gate, len(optimized_gates) - 1, report)
+
+    optimized_gates = [gate for gate in optimized_gates if gate is not None]
+    report.optimized_gate_count = len(optimized_gates)
+
+    return optimized_gates, report
+
+
+def fuse_single_qubit_gates(
+    gates: List[IGate],
+) -> Tuple[List[IGate], OptimizationReport]:
+    """Fuse runs of single qubit gates on the same qubit into a single
+    Unitary gate and return the resulting gates together with a report.
+
+    Runs are not interrupted by gates acting on other qubits. A run of
+    diagonal gates is also continued past diagonal gates on its qubit,
+    since they commute. Its fused gate is applied at the position of
+    the first gate of the run, so that each run requires only a single
+    pass over the state of its qubit group.
+    """
+    report = OptimizationReport(original_gate_count=len(gates))
+
+    fused_gates: List[Union[IGate, None]] = []
+
+    # Run of each qubit, consisting of the position of its fused gate,
+    # its gates, and whether it has been moved past other gates.
+    runs: Dict[int, Tuple[int, List[Gate], bool]] = {}
+
+    def close_run(qubit: int) -> None:
+        position, run_gates, _ = runs.pop(qubit)
+        if len(run_gates) == 1:
+            fused_gates[position] = run_gates[0]
+            return
+
+        matrix = run_gates[0].matrix
+        for gate in run_gates[1:]:
+            matrix = gate.matrix @ matrix
+
+        fused_gates[position] = Unitary(qubit, matrix)
+        report.fused_gates += len(run_gates) - 1
+
+    for gate in gates:
+        # Gates with unbound parameters have no matrix to be fused, and
+        # are treated like gates on multiple qubits.
+        if isinstance(gate, Gate) and get_gate_parameter(gate) is None:
+            run = runs.get(gate.target_qubit)
+            if run is not None and run[2] and not gate.is_diagonal:
+                close_run(gate.target_qubit)
+                run = None
+
+            if run is None:
+                fused_gates.append(None)
+                runs[gate.target_qubit] = (len(fused_gates) - 1, [gate], False)
+            else:
+                run[1].append(gate)
+
+            continue
+
+        for qubit in gate.qubits:
+            run = runs.get(qubit)
+            if run is None:
+                continue
+
+            if gate.is_diagonal and all(run_gate.is_diagonal for run_gate in run[1]):
+                runs[qubit] = (run[0], run[1], True)
+            else:
+                close_run(qubit)
+
+        fused_gates.append(gate)
+
+    for qubit in list(runs):
+        close_run(qubit)
+
+    report.optimized_gate_count = len(fused_gates)
+
+    return fused_gates, report
+
+
+def fuse_blocks(
+    gates: List[IGate], max_block_qubits: int = 3
+) -> Tuple[List[IGate], OptimizationReport]:
+    """Fuse neighboring gates acting on at most max_block_qubits qubits
+    into block gates and return the resulting gates together with a
+    report.
+
+    Gates are collected into open blocks. A gate joins the open blocks
+    sharing qubits with it, which are merged if their qubits together
+    do not exceed max_block_qubits. Otherwise, these blocks are closed
+    and the gate opens a new block. Since open blocks never share
+    qubits, gates of different blocks commute and each block is
+    emitted once it is closed. Blocks of a single gate are emitted as
+    that gate, blocks on a single qubit as Unitary gate.
+    """
+    report = OptimizationReport(original_gate_count=len(gates))
+
+    fused_gates: List[IGate] = []
+
+    # Open blocks by their qubits, each consisting of its qubits
+    # and its gates.
+    blocks: Dict[int, Tuple[List[int], List[IGate]]] = {}
+
+    def close_block(block: Tuple[List[int], List[IGate]]) -> None:
+        block_qubits, block_gates = block
+        for qubit in block_qubits:
+            del blocks[qubit]
+
+        if len(block_gates) == 1:
+            fused_gates.append(block_gates[0])
+            return
+
+        positions = {qubit: position for position, qubit in enumerate(block_qubits)}
+
+        matrix = get_operator(block_gates[0], len(block_qubits), positions)
+        for gate in block_gates[1:]:
+            matrix = get_operator(gate, len(block_qubits), positions) @ matrix
+
+        if len(block_qubits) == 1:
+            fused_gates.append(Unitary(block_qubits[0], matrix))
+        else:
+            fused_gates.append(BlockGate(block_qubits, matrix))
+
+        report.blocked_gates += len(block_gates) - 1
+
+    for gate in gates:
+        affected_blocks = _unique_blocks(
+            blocks[qubit] for qubit in gate.qubits if qubit in blocks
+        )
+
+        # Gates with unbound parameters have no matrix to be fused.
+        if get_gate_parameter(gate) is not None:
+            for block in affected_blocks:
+                close_block(block)
+
+            fused_gates.append(gate)
+            continue
+
+        block_qubits = set(gate.qubits)
+        for affected_qubits, _ in affected_blocks:
+            block_qubits.update(affected_qubits)
+        block_qubits = sorted(block_qubits)
+
+        if len(block_qubits) <= max_block_qubits:
+            # Gates of different blocks commute, so they keep their order
+            # within the merged block.
+            block_gates = [
+                block_gate
+                for _, affected_gates in affected_blocks
+                for block_gate in affected_gates
+            ]
+            for qubit in block_qubits:
+                blocks.pop(qubit, None)
+        else:
+            for block in affected_blocks:
+                close_block(block)
+
+            if len(gate.qubits) > max_block_qubits:
+                fused_gates.append(gate)
+                continue
+
+            block_qubits, block_gates = sorted(gate.qubits), []
+
+        block = (block_qubits, block_gates + [gate])
+        for qubit in block_qubits:
+            blocks[qubit] = block
+
+    for block in _unique_blocks(blocks.values()):
+        close_block(block)
+
+    report.optimized_gate_count = len(fused_gates)
+
+    return fused_gates, report
+
+
+def optimize_circuit(
+    circuit: Circuit, fuse_gates: bool = False, max_block_qubits: int = None
+) -> Tuple[Circuit, OptimizationReport]:
+    """Return an optimized copy of a circuit (see optimize_gates)
+    together with a report of the removed gates. If fuse_gates is
+    set, single qubit gates are fused afterwards (see
+    fuse_single_qubit_gates). If max_block_qubits is set, gates
+    are finally fused into blocks (see fuse_blocks)."""
+    optimized_circuit = Circuit(circuit.qubit_num)
+    optimized_circuit.gates, report = optimize_gates(circuit.gates)
+
+    if fuse_gates:
+        optimized_circuit.gates, fusion_report = fuse_single_qubit_gates(
+            optimized_circuit.gates
+        )
+        report = report.chain(fusion_report)
+
+    if max_block_qubits is not None:
+        optimized_circuit.gates, fusion_report = fuse_blocks(
+            optimized_circuit.gates, max_block_qubits=max_block_qubits
+        )
+        report = report.chain(fusion_report)
+
+    return optimized_circuit, report
+
+
+def _unique_blocks(blocks) -> List[Tuple[List[int], List[IGate]]]:
+    """Remove duplicate blocks (which are shared by all their qubits)
+    while keeping their order."""
+    unique_blocks = {}
+    for block in blocks:
+        unique_blocks.setdefault(id(block), block)
+    return list(unique_blocks.values())
+
+
+def _place_gate(
+    gates: List[Union[IGate, None]],
+    gate: IGate,
+    position: int,
+    report: OptimizationReport,
+) -> None:
+    """Combine a gate with the closest preceding gate it can be moved
+    next to, or place it at the specified position of the list of
+    gates. Removed gates are marked by None."""
+    for index in range(position - 1, -1, -1):
+        previous_gate = gates[index]
+        if previous_gate is None or set(previous_gate.qubits).isdisjoint(gate.qubits):
+            continue
+
+        if _cancels(previous_gate, gate):
+            gates[index] = None
+            report.cancelled_gates += 2
+            return
+
+        merged_gate = _merge(previous_gate, gate)
+        if merged_gate is not None:
+            gates[index] = None
+            if _is_identity(merged_gate):
+                report.cancelled_gates += 2
+            else:
+                report.merged_gates += 1
+                _place_gate(gates, merged_gate, index, report)
+            return
+
+        if not (previous_gate.is_diagonal and gate.is_diagonal):
+            break
+
+    gates[position] = gate
+
+
+def _cancels(gate1: IGate, gate2: IGate) -> bool:
+    """Indicate if two gates are the same self-inverse gate."""
+    return (
+        type(gate1) == type(gate2)
+        and gate1.is_self_inverse
+        and get_gate_parameter(gate1) is None
+        and get_gate_parameter(gate2) is None
+        and get_gate_fingerprint(gate1) == get_gate_fingerprint(gate2)
+    )
+
+
+def _get_angle(gate: IGate) -> float:
+    if type(gate) in FIXED_ANGLES:
+        return FIXED_ANGLES[type(gate)]
+    return gate.theta
+
+
+def _merge(gate1: IGate, gate2: IGate) -> Union[IGate, None]:
+    """Return a gate equivalent to two rotations of the same family on
+    the same qubits, or None if the gates cannot be merged."""
+    family = ROTATION_FAMILIES.get(type(gate1))
+    if family is None or family != ROTATION_FAMILIES.get(type(gate2)):
+        return None
+
+    # Unbound parameters cannot be added.
+    if get_gate_parameter(gate1) is not None or get_gate_parameter(gate2) is not None:
+        return None
+
+    if get_gate_fingerprint(gate1)[1] != get_gate_fingerprint(gate2)[1]:
+        return None
+
+    angle = _get_angle(gate1) + _get_angle(gate2)
+
+    if issubclass(family, CGate):
+        qubits = (gate1.control_qubit, gate1.target_qubit)
+    else:
+        qubits = (gate1.target_qubit,)
+
+    # Prefer the gates with fixed angles over phase gates.
+    for gate_class, fixed_angle in FIXED_ANGLES.items():
+        if ROTATION_FAMILIES[gate_class] == family and _is_multiple(
+            angle - fixed_angle, ROTATION_PERIODS[family]
+        ):
+            return gate_class(*qubits)
+
+    return family(*qubits, angle)
+
+
+def _is_identity(gate: IGate) -> bool:
+    """Indicate if a rotation acts as the identity."""
+    period = ROTATION_PERIODS.get(type(gate))
+    return (
+        period is not None
+        and get_gate_parameter(gate) is None
+        and _is_multiple(gate.theta, period)
+    )
+
+
+def _is_multiple(angle: float, period: float) -> bool:
+    remainder = math.remainder(angle, period)
+    return abs(remainder) < ANGLE_TOLERANCE
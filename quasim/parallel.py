@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import copy
+import math
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from typing import List, Tuple, TYPE_CHECKING
+
+from .circuit import Circuit
+from .gates import IGate
+from .gates.utils import get_gate_arguments, has_instance_matrix
+from .optimizer import OptimizationReport
+
+if TYPE_CHECKING:
+    from .simulator import QuaSim
+
+
+EncodedCircuit = Tuple[int, List[Tuple[type, Tuple]]]
+
+
+def encode_circuit(circuit: Circuit) -> EncodedCircuit:
+    """Encode a circuit as its qubit number and a list of gate classes
+    together with their constructor arguments. Gates whose arguments
+    cannot be determined, or which cannot be recreated from them (see
+    is_recreatable), are kept as they are."""
+    encoded_gates = []
+    for gate in circuit.gates:
+        try:
+            arguments = get_gate_arguments(gate)
+        except AttributeError:
+            encoded_gates.append((None, gate))
+            continue
+
+        if is_recreatable(gate, arguments):
+            encoded_gates.append((type(gate), arguments))
+        else:
+            encoded_gates.append((None, gate))
+
+    return circuit.qubit_num, encoded_gates
+
+
+def is_recreatable(gate: IGate, arguments: Tuple) -> bool:
+    """Indicate if a gate is recreated by calling its class with the
+    specified constructor arguments. This is not the case for gates
+    whose matrix has been changed after construction (e.g. the gates
+    created by create_equivalent_cgate), while the matrices computed
+    by the constructors of rotations are recreated."""
+    if not has_instance_matrix(gate):
+        return True
+
+    return np.array_equal(type(gate)(*arguments).matrix, gate.matrix)
+
+
+def decode_circuit(encoded_circuit: EncodedCircuit) -> Circuit:
+    """Recreate a circuit from its encoded form."""
+    qubit_num, encoded_gates = encoded_circuit
+
+    circuit = Circuit(qubit_num)
+    for gate_class, arguments in encoded_gates:
+        gate: IGate = arguments if gate_class is None else gate_class(*arguments)
+        circuit.apply(gate)
+
+    return circuit
+
+
+# State of each worker process, set by _initialize_worker.
+_worker_simulator: "QuaSim" = None
+_worker_memory: SharedMemory = None
+
+
+def _initialize_worker(simulator: "QuaSim", memory_name: str) -> None:
+    global _worker_simulator, _worker_memory
+
+    _worker_simulator = simulator
+    _worker_memory = SharedMemory(name=memory_name)
+
+
+def _evaluate_encoded_circuit(
+    task: Tuple[int, EncodedCircuit]
+) -> OptimizationReport:
+    """Evaluate an encoded circuit and write its state into the shared
+    memory block at the specified offset (in amplitudes). Returns the
+    report of the gates removed while evaluating the circuit."""
+    offset, encoded_circuit = task
+
+    circuit = decode_circuit(encoded_circuit)
+    _worker_simulator.optimization_report = OptimizationReport()
+    _worker_simulator.evaluate_circuit(circuit)
+
+    results = np.ndarray(
+        (2**circuit.qubit_num,),
+        dtype=np.complex128,
+        buffer=_worker_memory.buf,
+        offset=offset * np.dtype(np.complex128).itemsize,
+    )
+    results[:] = circuit.state
+
+    return _worker_simulator.optimization_report
+
+
+def evaluate_in_parallel(
+    simulator: "QuaSim", circuits: List[Circuit], workers: int, chunksize: int = None
+) -> None:
+    """Evaluate a list of circuits with a pool of worker processes,
+    each holding a copy of the specified simulator.
+
+    Circuits are sent to the workers in encoded form. The workers
+    write the resulting states into one shared memory block, from
+    which they are copied into the circuits in input order. Circuits
+    that already have a state are skipped.
+
+    The result and disk caches of the simulator are not passed to the
+    workers, since they are handled by QuaSim.evaluate. Prefix caches
+    start empty in every worker. The reports of the gates removed by
+    the workers are added to simulator.optimization_report.
+    """
+    pending_circuits = [circuit for circuit in circuits if not circuit.is_evaluated]
+    if len(pending_circuits) == 0:
+        return
+
+    offsets, size = [], 0
+    for circuit in pending_circuits:
+        offsets.append(size)
+        size += 2**circuit.qubit_num
+
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(pending_circuits) / (4 * workers)))
+
+    tasks = [
+        (offset, encode_circuit(circuit))
+        for offset, circuit in zip(offsets, pending_circuits)
+    ]
+
+    worker_simulator = copy.copy(simulator)
+    worker_simulator.result_cache = None
+    worker_simulator.disk_cache = None
+
+    memory = SharedMemory(create=True, size=size * np.dtype(np.complex128).itemsize)
+    try:
+        with multiprocessing.Pool(
+            processes=workers,
+            initializer=_initialize_worker,
+            initargs=(worker_simulator, memory.name),
+        ) as pool:
+            reports = pool.map(_evaluate_encoded_circuit, tasks, chunksize=chunksize)
+
+        for report in reports:
+            simulator.optimization_report += report
+
+        results = np.ndarray((size,), dtype=np.complex128, buffer=memory.buf)
+        for offset, circuit in zip(offsets, pending_circuits):
+            circuit.set_state(results[offset : offset + 2**circuit.qubit_num].copy())
+
+        del results
+
+    finally:
+        memory.close()
+        memory.unlink()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import copy
+import numpy as np
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+from .gates import IGate, Parameter, RX, RY, RZ, Phase, CRX, CRY, CRZ, CPhase
+from .gates._matrices import (
+    RX_MATRICES,
+    RY_MATRICES,
+    RZ_MATRICES,
+    PHASE_MATRICES,
+)
+
+# Values of the parameters of a circuit, either keyed by parameter or
+# given in the order of Circuit.parameters. Sweeps expect one array of
+# values per parameter (or an array of shape (sweep_size, parameter_num)).
+ParameterValues = Union[Dict[Parameter, float], Sequence[float], np.ndarray]
+
+# Functions computing the matrices of parameterized gates for an array
+# of angles at once.
+PARAMETER_MATRICES: Dict[type, Callable[[np.ndarray], np.ndarray]] = {
+    RX: RX_MATRICES,
+    RY: RY_MATRICES,
+    RZ: RZ_MATRICES,
+    Phase: PHASE_MATRICES,
+    CRX: RX_MATRICES,
+    CRY: RY_MATRICES,
+    CRZ: RZ_MATRICES,
+    CPhase: PHASE_MATRICES,
+}
+
+
+def get_gate_parameter(gate: IGate) -> Union[Parameter, None]:
+    """Return the unbound parameter of a gate, if any."""
+    theta = getattr(gate, "theta", None)
+    if isinstance(theta, Parameter):
+        return theta
+    return None
+
+
+def get_parameter_values(
+    parameters: List[Parameter], values: ParameterValues
+) -> Dict[Parameter, np.ndarray]:
+    """Return the values of the specified parameters keyed by parameter.
+
+    Values given as sequence (or array whose last axis runs over the
+    parameters) are assigned in the order of the parameters. Missing
+    values raise a ValueError.
+    """
+    if isinstance(values, dict):
+        missing_parameters = [
+            parameter for parameter in parameters if parameter not in values
+        ]
+        if len(missing_parameters) > 0:
+            raise ValueError(f"No values for the parameters {missing_parameters}")
+
+        return {parameter: np.asarray(values[parameter]) for parameter in parameters}
+
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1:] != (len(parameters),):
+        raise ValueError(
+            f"Expected values for {len(parameters)} parameters, got {values.shape}"
+        )
+
+    return {
+        parameter: values[..., position]
+        for position, parameter in enumerate(parameters)
+    }
+
+
+def bind_gates(
+    gates: List[IGate],
+    parameter_positions: List[Tuple[int, Parameter]],
+    values: Dict[Parameter, np.ndarray],
+) -> List[IGate]:
+    """Return a copy of a list of gates, in which the parameterized
+    gates at the specified positions are bound to the values of their
+    parameters. All other gates are shared with the original list.
+
+    Bound gates are copied instead of constructed again, and the
+    matrices of all gates of the same class are computed by a single
+    vectorized call.
+    """
+    bound_gates = list(gates)
+
+    positions_by_class: Dict[type, List[Tuple[int, Parameter]]] = {}
+    for position, parameter in parameter_positions:
+        positions_by_class.setdefault(type(gates[position]), []).append(
+            (position, parameter)
+        )
+
+    for gate_class, class_positions in positions_by_class.items():
+        thetas = np.array(
+            [float(values[parameter]) for _, parameter in class_positions]
+        )
+        matrices = PARAMETER_MATRICES[gate_class](thetas)
+
+        for (position, _), theta, matrix in zip(class_positions, thetas, matrices):
+            bound_gate = copy.copy(gates[position])
+            bound_gate.theta = float(theta)
+            bound_gate.matrix = matrix
+            bound_gates[position] = bound_gate
+
+    return bound_gates
+
+
+def get_sweep_matrices(
+    gates: List[IGate],
+    parameter_positions: List[Tuple[int, Parameter]],
+    values: Dict[Parameter, np.ndarray],
+) -> Dict[int, np.ndarray]:
+    """Return the matrices of the parameterized gates at the specified
+    positions for all values of a sweep, keyed by gate position. Each
+    entry has the shape (sweep_size, 2, 2)."""
+    return {
+        position: PARAMETER_MATRICES[type(gates[position])](
+            np.asarray(values[parameter], dtype=np.float64)
+        )
+        for position, parameter in parameter_positions
+    }
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from typing import Union
+
+Seed = Union[int, np.random.Generator, None]
+
+
+class CumulativeSampler:
+    """Draws samples from a discrete distribution, whose cumulative
+    distribution is computed once when the sampler is created.
+
+    Every shot is drawn by a binary search of a uniform random number
+    in the cumulative distribution, so that drawing a batch of shots
+    takes O(shots log n) time for a distribution over n outcomes. The
+    probabilities do not have to be normalized.
+    """
+
+    cumulative_probabilities: np.ndarray
+
+    def __init__(self, probabilities: np.ndarray) -> None:
+        self.cumulative_probabilities = np.cumsum(probabilities)
+
+        # index of the last outcome with a probability different from 0
+        self._last_index = int(
+            np.searchsorted(
+                self.cumulative_probabilities, self.cumulative_probabilities[-1]
+            )
+        )
+
+    def sample(self, shots: int, seed: Seed = None) -> np.ndarray:
+        """Returns the indices of shots outcomes drawn from the distribution.
+
+        The seed is either an integer seed, a random generator (which
+        allows drawing from the same random stream across samplers),
+        or None for a random seed.
+        """
+        rng = np.random.default_rng(seed)
+
+        total = self.cumulative_probabilities[-1]
+        indices = np.searchsorted(
+            self.cumulative_probabilities, rng.random(shots) * total, side="right"
+        )
+
+        # Rounding can move a uniform number onto the upper bound.
+        return np.minimum(indices, self._last_index)
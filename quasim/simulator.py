@@ -1,116 +1,728 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from .circuit import Circuit
-from .gates import IGate, Swap, Gate, CGate, CCGate
+from .batch import evaluate_batch, evaluate_sweep
+from .cache import DiskCache, PrefixCache, ResultCache, get_prefix_hashes
+from .engines import IEngine, KernelEngine
+from .gates import IGate, Swap, Gate, CGate, CCGate, BlockGate
+from .gradients import GENERATORS, adjoint_gradient
+from .optimizer import (
+    OptimizationReport,
+    optimize_gates,
+    fuse_single_qubit_gates,
+    fuse_blocks,
+)
+from .observables import Observable, expectation, parse_pauli_string
+from .parallel import evaluate_in_parallel
+from .parameters import ParameterValues, get_parameter_values, get_sweep_matrices
+from .sampling import Seed
+from .state import FactorizedState
 from .utils import (
     QubitGroup,
-    is_in_ket0,
-    is_in_ket1,
+    QubitRegistry,
+    SimulationState,
+    get_classical_bit,
     initialize_qubit_groups,
-    get_sorted_state,
-    apply_gate,
-    apply_cgate,
-    apply_ccgate,
     apply_swap_gate,
     select_affected_qubit_group,
+    create_equivalent_cgate,
+    track_basis_state,
+    factorize_state,
 )
 
 
 def merge_qubit_groups(
-    relevant_groups: List[QubitGroup], total_groups: List[QubitGroup]
+    relevant_groups: List[QubitGroup], total_groups: QubitRegistry
 ) -> QubitGroup:
     """Merge selected (relevant) qubit groups into a single qubit group
-    and remove the previous qubit groups from the list of all qubit groups.
-    The removal happens in place, while the merged qubit group is returned.
+    and remove the previous qubit groups from the registry of all qubit
+    groups. The removal happens in place, while the merged qubit group
+    is returned.
     """
+    return total_groups.merge(relevant_groups)
 
-    # remove duplicates
-    relevant_groups = list(set(relevant_groups))
 
-    merged_qubit_group = relevant_groups[0]
-    for qubit_group in relevant_groups[1:]:
-        merged_qubit_group.qubits.extend(qubit_group.qubits)
-        merged_qubit_group.state = np.kron(merged_qubit_group.state, qubit_group.state)
+def split_qubit_group(
+    qubit_group: QubitGroup, qubits: List[int], tolerance: float = 1e-10
+) -> List[QubitGroup]:
+    """Split a qubit group into smaller qubit groups as long as they
+    factorize and return the resulting qubit groups.
 
-        total_groups.remove(qubit_group)
+    Since testing all partitions of the group is infeasible, only
+    partitions involving the specified qubits (usually the qubits
+    of the last gate) are tested: each qubit on its own, and the
+    qubits of the group before and after each qubit, which recovers
+    groups that have been merged in the same order.
+    """
+    qubit_num = len(qubit_group.qubits)
+    if qubit_num == 1:
+        return [qubit_group]
+
+    positions = [
+        position
+        for position, qubit in enumerate(qubit_group.qubits)
+        if qubit in qubits
+    ]
+
+    tensor = qubit_group.state.reshape((2,) * qubit_num)
+
+    for position in positions:
+        remaining_positions = [
+            other_position
+            for other_position in range(qubit_num)
+            if other_position != position
+        ]
+        state = np.moveaxis(tensor, position, 0)
+
+        factors = factorize_state(state, tolerance)
+        if factors is not None:
+            return _split_qubit_group(
+                qubit_group, [position], remaining_positions, factors, qubits, tolerance
+            )
 
-    return merged_qubit_group
+    cuts = set(position for position in positions if position > 0)
+    cuts.update(position + 1 for position in positions if position + 1 < qubit_num)
+
+    for cut in sorted(cuts):
+        state = qubit_group.state.reshape(2**cut, -1)
+
+        factors = factorize_state(state, tolerance)
+        if factors is not None:
+            return _split_qubit_group(
+                qubit_group,
+                list(range(cut)),
+                list(range(cut, qubit_num)),
+                factors,
+                qubits,
+                tolerance,
+            )
 
+    return [qubit_group]
 
-def aggregate_qubit_groups(qubit_groups: List[QubitGroup]) -> QubitGroup:
-    """Combine a list of qubit groups into a new joined qubit group."""
-    aggregated_qubit_group = qubit_groups[0]
-    for qubit_group in qubit_groups[1:]:
-        aggregated_qubit_group.qubits.extend(qubit_group.qubits)
-        aggregated_qubit_group.state = np.kron(
-            aggregated_qubit_group.state, qubit_group.state
-        )
-    return aggregated_qubit_group
+
+def _split_qubit_group(
+    qubit_group: QubitGroup,
+    left_positions: List[int],
+    right_positions: List[int],
+    factors: Tuple[np.ndarray, np.ndarray],
+    qubits: List[int],
+    tolerance: float,
+) -> List[QubitGroup]:
+    left_group = QubitGroup(
+        qubits=[qubit_group.qubits[position] for position in left_positions],
+        state=np.ascontiguousarray(factors[0]),
+    )
+    right_group = QubitGroup(
+        qubits=[qubit_group.qubits[position] for position in right_positions],
+        state=np.ascontiguousarray(factors[1]),
+    )
+
+    return split_qubit_group(left_group, qubits, tolerance) + split_qubit_group(
+        right_group, qubits, tolerance
+    )
 
 
 class QuaSim:
     """Quantum circuit simulator used to evaluate quantum
     circuits.
-    """
 
-    def __init__(self) -> None:
-        pass
+    Gates are applied by the specified engine, which defaults
+    to the KernelEngine. The MatrixEngine can be passed as a
+    (slower) reference implementation.
+
+    Controlled diagonal gates whose qubits belong to different
+    qubit groups are deferred until another gate acts on one of
+    their qubits, since applying them would force the groups to
+    be merged. This can be disabled through defer_diagonal_gates.
+
+    Controlled gates only merge the qubit groups of their control
+    and target qubits if a control qubit is in superposition. Control
+    qubits in a computational basis state are detected even if they
+    belong to a larger qubit group.
+
+    As long as a circuit keeps its register in a computational basis
+    state, the state is tracked as a bit string with a global phase
+    and only expanded into qubit groups at the first gate creating
+    a superposition. This can be disabled through track_basis_states.
+
+    The state at the end of a circuit is attached to it as a product
+    of the states of its qubit groups (circuit.factorized_state), from
+    which circuit.state only builds the full state when it is accessed.
+
+    If split_groups is set, the qubit groups affected by a gate on
+    multiple qubits are tested for factorization afterwards (see
+    split_qubit_group) and split, so that qubits returning to a
+    product state no longer share an exponentially large state.
+
+    If a prefix cache is specified, circuits resume from the state
+    after the longest prefix of gates that has already been simulated.
+
+    If incremental is set, the simulation state at the end of each
+    circuit is attached to the circuit, so that re-evaluating it after
+    appending gates (or evaluating a copy with appended gates) only
+    requires simulating the new gates.
+
+    If a result cache is specified, circuits whose fingerprint matches
+    a previously evaluated circuit receive its state without being
+    simulated.
+
+    If a disk cache is specified, final states are additionally kept
+    on disk, so that they are reused across processes and restarts.
+    It is consulted after the result cache.
+
+    If optimize is set, the gates of each circuit are shortened by a
+    peephole optimizer (see quasim.optimizer) before they are simulated.
+
+    If fuse_gates is set, runs of single qubit gates on the same
+    qubit are fused into a single gate before simulation, so that
+    the state of their qubit group is only traversed once per run.
 
-    def evaluate(self, circuits: List[Circuit]) -> None:
+    If max_block_qubits is set, neighboring gates acting on at most
+    that many qubits are fused into dense block gates, which are
+    applied with a single pass over the state of their qubit group.
+
+    The gates removed by these passes across all evaluations are
+    summarized in optimization_report.
+    """
+
+    engine: IEngine
+    defer_diagonal_gates: bool
+    track_basis_states: bool
+    prefix_cache: PrefixCache
+    incremental: bool
+    result_cache: ResultCache
+    disk_cache: DiskCache
+    optimize: bool
+    fuse_gates: bool
+    max_block_qubits: int
+    split_groups: bool
+    optimization_report: OptimizationReport
+
+    def __init__(
+        self,
+        engine: IEngine = None,
+        defer_diagonal_gates: bool = True,
+        track_basis_states: bool = True,
+        prefix_cache: PrefixCache = None,
+        incremental: bool = False,
+        result_cache: ResultCache = None,
+        disk_cache: DiskCache = None,
+        optimize: bool = False,
+        fuse_gates: bool = False,
+        max_block_qubits: int = None,
+        split_groups: bool = False,
+    ) -> None:
+        if engine is None:
+            engine = KernelEngine()
+
+        self.engine = engine
+        self.defer_diagonal_gates = defer_diagonal_gates
+        self.track_basis_states = track_basis_states
+        self.prefix_cache = prefix_cache
+        self.incremental = incremental
+        self.result_cache = result_cache
+        self.disk_cache = disk_cache
+        self.optimize = optimize
+        self.fuse_gates = fuse_gates
+        self.max_block_qubits = max_block_qubits
+        self.split_groups = split_groups
+        self.optimization_report = OptimizationReport()
+
+    def evaluate(
+        self, circuits: List[Circuit], workers: int = 1, chunksize: int = None
+    ) -> None:
         """Evaluates a list of quantum circuits and stores the
-        state at the end of each circuit in circuit.state."""
+        state at the end of each circuit in circuit.state.
+
+        If more than one worker is specified, the circuits are
+        evaluated by a pool of worker processes, which receive
+        the circuits in chunks of chunksize. The result and disk
+        caches are consulted and filled before and after the
+        workers run, so that only circuits missing from them are
+        sent to the workers.
+        """
+
+        if workers > 1:
+            pending_circuits = []
+            for circuit in circuits:
+                if circuit.is_evaluated:
+                    continue
+
+                self._check_parameters(circuit)
+                fingerprints = self._lookup_result(circuit)
+                if not circuit.is_evaluated:
+                    pending_circuits.append((circuit, fingerprints))
+
+            evaluate_in_parallel(
+                self,
+                [circuit for circuit, _ in pending_circuits],
+                workers=workers,
+                chunksize=chunksize,
+            )
+
+            for circuit, fingerprints in pending_circuits:
+                self._store_result(circuit, fingerprints)
+            return
+
+        for circuit in circuits:
+            self.evaluate_circuit(circuit)
+
+    def sample(
+        self,
+        circuits: List[Circuit],
+        shots: int,
+        seed: Seed = None,
+        output: str = "counts",
+        integer_keys: bool = False,
+    ) -> List[Union[Dict, np.ndarray]]:
+        """Evaluates a list of quantum circuits and draws shots
+        measurements from the state at the end of each circuit
+        (see Circuit.sample).
+
+        All circuits are sampled from one random stream, so that
+        the results are reproducible for a given seed.
+        """
+
+        self.evaluate(circuits)
+
+        rng = np.random.default_rng(seed)
+        return [
+            circuit.sample(shots, seed=rng, output=output, integer_keys=integer_keys)
+            for circuit in circuits
+        ]
+
+    def expectation(
+        self, circuits: List[Circuit], observables: List[Observable]
+    ) -> np.ndarray:
+        """Evaluates a list of quantum circuits and returns the
+        expectation values of the specified Pauli strings in the
+        state at the end of each circuit (see quasim.expectation)
+        as an array of shape (len(circuits), len(observables)).
+        """
+
+        self.evaluate(circuits)
+
+        return np.array(
+            [expectation(circuit, observables) for circuit in circuits]
+        ).reshape(len(circuits), len(observables))
+
+    def sweep(
+        self,
+        circuit: Circuit,
+        parameter_values: ParameterValues,
+        batch_size: int = None,
+    ) -> np.ndarray:
+        """Evaluates a parameterized circuit for every set of values
+        of its parameters and returns the final states as an array of
+        shape (sweep_size, 2^qubit_num).
+
+        The values are given as an array of shape (sweep_size,
+        len(circuit.parameters)) or as a dictionary of one array of
+        values per parameter. The matrices of every parameterized gate
+        are computed for all values at once, and the sweep is simulated
+        as one stacked state array, of which at most batch_size states
+        are simulated at once. No circuits are created for the values.
+
+        By default, batches hold about 2^18 amplitudes, since larger
+        batches no longer fit into the CPU caches.
+        """
+
+        parameters = circuit.parameters
+        if len(parameters) == 0:
+            raise ValueError("The circuit has no parameters to sweep")
+
+        parameter_positions = circuit.parameter_positions
+        values = get_parameter_values(parameters, parameter_values)
+
+        sweep_size = len(values[parameters[0]])
+        if any(len(values[parameter]) != sweep_size for parameter in parameters):
+            raise ValueError("All parameters require the same amount of values")
+
+        if batch_size is None:
+            batch_size = max(1, 2**18 // 2**circuit.qubit_num)
+
+        states = np.empty((sweep_size, 2**circuit.qubit_num), dtype=np.complex128)
+        for start in range(0, sweep_size, batch_size):
+            stop = min(start + batch_size, sweep_size)
+
+            sweep_matrices = get_sweep_matrices(
+                circuit.gates,
+                parameter_positions,
+                {parameter: values[parameter][start:stop] for parameter in parameters},
+            )
+            states[start:stop] = evaluate_sweep(
+                circuit.gates, sweep_matrices, stop - start, circuit.qubit_num
+            )
+
+        return states
+
+    def gradient(
+        self,
+        circuit: Circuit,
+        observable: Observable,
+        parameter_values: ParameterValues = None,
+    ) -> np.ndarray:
+        """Returns the derivatives of the expectation value of a Pauli
+        string in the final state of a circuit with respect to the
+        angles of its rotations (RX, RY, RZ, Phase, CRX, CRY, CRZ,
+        and CPhase gates), computed by adjoint differentiation.
+
+        For a circuit without parameters, one derivative per rotation
+        is returned in the order of the gates. For a parameterized
+        circuit, the circuit is bound to the specified parameter values
+        and one derivative per parameter is returned in the order of
+        circuit.parameters; rotations sharing a parameter add up their
+        derivatives, and rotations with a fixed angle are ignored.
+
+        Unlike the parameter shift rule, which requires two simulations
+        per rotation, the cost is about that of three simulations for
+        any amount of rotations. Since every gate has to be undone, the
+        gates are applied to the full state vector as they are, without
+        qubit groups or optimizations.
+        """
+        pauli_string = parse_pauli_string(observable, circuit.qubit_num)
+
+        parameter_positions = circuit.parameter_positions
+        if len(parameter_positions) > 0:
+            if parameter_values is None:
+                raise ValueError("The parameters of the circuit have to be bound")
+            gates = circuit.bind(parameter_values).gates
+        else:
+            gates = circuit.gates
+
+        gate_gradients = adjoint_gradient(gates, circuit.qubit_num, pauli_string)
+        if len(parameter_positions) == 0:
+            return gate_gradients
+
+        rotation_positions = [
+            position for position, gate in enumerate(gates) if type(gate) in GENERATORS
+        ]
+        indices = {position: index for index, position in enumerate(rotation_positions)}
+
+        parameters = circuit.parameters
+        parameter_indices = {
+            parameter: index for index, parameter in enumerate(parameters)
+        }
+
+        gradients = np.zeros(len(parameters))
+        for position, parameter in parameter_positions:
+            gradients[parameter_indices[parameter]] += gate_gradients[indices[position]]
+
+        return gradients
+
+    def evaluate_batch(self, circuits: List[Circuit], batch_size: int = None) -> None:
+        """Evaluates a list of quantum circuits by simulating circuits
+        of equal width as one stacked state array and stores the
+        state at the end of each circuit in circuit.state.
+
+        Gates that share the same target qubit are applied to
+        all affected circuits at once, which removes most of the
+        per-gate overhead for large amounts of small circuits. Since
+        the full state of every circuit is kept in memory, at most
+        batch_size circuits are simulated at once.
+        """
+
+        for circuit in circuits:
+            if not circuit.is_evaluated:
+                self._check_parameters(circuit)
+
+        evaluate_batch(circuits, batch_size=batch_size)
+
+    def iter_evaluate(
+        self,
+        circuits: Iterable[Circuit],
+        output: str = "state",
+        release_states: bool = False,
+    ) -> Iterator[Tuple[Circuit, np.ndarray]]:
+        """Lazily evaluates quantum circuits one after another and
+        yields each circuit together with its state (output="state")
+        or probabilities (output="probabilities") as soon as it has
+        been evaluated.
+
+        If release_states is set, the state of a circuit is removed
+        from it once the consumer requests the next result, so that
+        only one state is kept in memory at a time.
+        """
+
+        if output not in ("state", "probabilities"):
+            raise ValueError(f"Unknown output '{output}'")
 
         for circuit in circuits:
             self.evaluate_circuit(circuit)
 
+            if output == "state":
+                yield circuit, circuit.state
+            else:
+                yield circuit, circuit.probabilities
+
+            if release_states:
+                circuit.set_state(None)
+
     def evaluate_circuit(self, circuit: Circuit) -> None:
         """Evaluates a quantum circuit and stores the
         state at the end of the circuit in circuit.state."""
 
-        if circuit.state is not None:
-            return circuit.state
+        if circuit.is_evaluated:
+            return
 
-        qubit_groups = initialize_qubit_groups(circuit.qubit_num)
+        self._check_parameters(circuit)
 
-        for gate in circuit.gates:
-            if type(gate) == Swap:
-                self._apply_swap_gate(qubit_groups, gate)
-                continue
+        fingerprints = self._lookup_result(circuit)
+        if circuit.is_evaluated:
+            return
 
-            elif issubclass(gate.__class__, Gate):
-                self._apply_gate(qubit_groups, gate)
+        self._evaluate_circuit(circuit)
+        self._store_result(circuit, fingerprints)
 
-            elif issubclass(gate.__class__, CGate):
-                self._apply_cgate(qubit_groups, gate)
+    def _check_parameters(self, circuit: Circuit) -> None:
+        if len(circuit.parameter_positions) > 0:
+            raise ValueError(
+                "The circuit has unbound parameters, which have to be bound "
+                "through Circuit.bind before it is evaluated"
+            )
 
-            elif issubclass(gate.__class__, CCGate):
-                self._apply_ccgate(qubit_groups, gate)
+    def _get_result_caches(
+        self, circuit: Circuit
+    ) -> List[Union[ResultCache, DiskCache]]:
+        """Returns the result caches that can hold the full state of
+        the circuit. Larger states are neither looked up nor stored,
+        since storing them would build the full state of a circuit
+        that might otherwise stay factorized."""
+        nbytes = 2**circuit.qubit_num * np.dtype(np.complex128).itemsize
+        return [
+            cache
+            for cache in (self.result_cache, self.disk_cache)
+            if cache is not None and nbytes <= cache.max_bytes
+        ]
+
+    def _lookup_result(self, circuit: Circuit) -> Dict[int, str]:
+        """Look up the state of a circuit in the result caches and attach
+        it to the circuit on a hit. Returns the fingerprints of the
+        circuit keyed by the decimals of the caches."""
+        result_caches = self._get_result_caches(circuit)
+
+        fingerprints: Dict[int, str] = {}
+        for cache in result_caches:
+            if cache.decimals not in fingerprints:
+                fingerprints[cache.decimals] = circuit.fingerprint(
+                    decimals=cache.decimals
+                )
 
-            else:
-                raise NotImplementedError(
-                    f"Unknown gate type for {gate} ({type(gate)})"
+        # Caches are consulted in order; a hit is propagated to the
+        # caches consulted before it.
+        for position, cache in enumerate(result_caches):
+            state = cache.lookup(fingerprints[cache.decimals])
+            if state is not None:
+                for previous_cache in result_caches[:position]:
+                    state = previous_cache.store(
+                        fingerprints[previous_cache.decimals], state
+                    )
+                circuit.set_state(state)
+                break
+
+        return fingerprints
+
+    def _store_result(self, circuit: Circuit, fingerprints: Dict[int, str]) -> None:
+        """Store the state of an evaluated circuit in the result caches."""
+        for cache in self._get_result_caches(circuit):
+            circuit.set_state(cache.store(fingerprints[cache.decimals], circuit.state))
+
+    def _evaluate_circuit(self, circuit: Circuit) -> None:
+        gates = circuit.gates
+
+        if self.prefix_cache is not None:
+            prefix_hashes = get_prefix_hashes(gates, circuit.qubit_num)
+            gate_count, simulation_state = self.prefix_cache.lookup(prefix_hashes)
+        else:
+            prefix_hashes = None
+            gate_count, simulation_state = 0, None
+
+        if (
+            circuit.simulation_state is not None
+            and circuit.simulated_gate_count > gate_count
+        ):
+            gate_count = circuit.simulated_gate_count
+            simulation_state = circuit.simulation_state.copy()
+
+        if simulation_state is None:
+            gate_count, simulation_state = self._initialize_simulation_state(
+                gates, circuit.qubit_num
+            )
+
+        qubit_groups = simulation_state.qubit_groups
+        deferred_gates = simulation_state.deferred_gates
+
+        remaining_gates = gates[gate_count:]
+
+        rewrite_gates = (
+            self.optimize or self.fuse_gates or self.max_block_qubits is not None
+        )
+        if rewrite_gates:
+            report = OptimizationReport(
+                original_gate_count=len(remaining_gates),
+                optimized_gate_count=len(remaining_gates),
+            )
+
+            if self.optimize:
+                remaining_gates, pass_report = optimize_gates(remaining_gates)
+                report = report.chain(pass_report)
+
+            if self.fuse_gates:
+                remaining_gates, pass_report = fuse_single_qubit_gates(remaining_gates)
+                report = report.chain(pass_report)
+
+            if self.max_block_qubits is not None:
+                remaining_gates, pass_report = fuse_blocks(
+                    remaining_gates, max_block_qubits=self.max_block_qubits
                 )
+                report = report.chain(pass_report)
+
+            self.optimization_report += report
+
+        for position, gate in enumerate(remaining_gates):
+            # Deferred gates commute with all diagonal gates, but have to
+            # be applied before any other gate acting on their qubits.
+            if len(deferred_gates) > 0 and not gate.is_diagonal:
+                self._apply_deferred_gates(
+                    qubit_groups, deferred_gates, qubits=gate.qubits
+                )
+
+            if self.defer_diagonal_gates and self._is_deferrable(qubit_groups, gate):
+                deferred_gates.append(gate)
+            else:
+                self._apply(qubit_groups, gate)
+
+            if prefix_hashes is None:
+                continue
+
+            # Rewritten gates no longer correspond to the prefixes of the
+            # circuit, so only the state after all gates is stored.
+            gate_index = gate_count + position
+            if position + 1 == len(remaining_gates):
+                self.prefix_cache.store(prefix_hashes[-1], simulation_state)
+            elif (
+                not rewrite_gates
+                and (gate_index + 1) % self.prefix_cache.snapshot_interval == 0
+            ):
+                self.prefix_cache.store(prefix_hashes[gate_index], simulation_state)
+
+        if self.incremental:
+            circuit.set_simulation_state(simulation_state.copy(), len(gates))
 
-        aggregated_qubit_group = aggregate_qubit_groups(qubit_groups)
+        self._apply_deferred_gates(qubit_groups, deferred_gates)
 
-        sorted_state = get_sorted_state(aggregated_qubit_group)
+        circuit.set_factorized_state(
+            FactorizedState(qubit_groups.qubit_groups, circuit.qubit_num)
+        )
+
+    def _initialize_simulation_state(
+        self, gates: List[IGate], qubit_num: int
+    ) -> Tuple[int, SimulationState]:
+        """Create the simulation state of a circuit starting in |0...0>.
+
+        If basis states are tracked, the gates keeping the circuit in a
+        computational basis state are applied right away. Returns the
+        amount of applied gates and the simulation state.
+        """
+
+        if not self.track_basis_states:
+            qubit_groups = QubitRegistry(initialize_qubit_groups(qubit_num))
+            return 0, SimulationState(qubit_groups, deferred_gates=[])
+
+        gate_count, basis_state, phase = track_basis_state(gates, qubit_num)
+
+        qubit_groups = QubitRegistry(
+            initialize_qubit_groups(qubit_num, basis_state=basis_state, phase=phase)
+        )
+        return gate_count, SimulationState(qubit_groups, deferred_gates=[])
+
+    def _apply(self, qubit_groups: QubitRegistry, gate: IGate) -> None:
+        if type(gate) == Swap:
+            self._apply_swap_gate(qubit_groups, gate)
+
+        elif issubclass(gate.__class__, Gate):
+            self._apply_gate(qubit_groups, gate)
+
+        elif issubclass(gate.__class__, CGate):
+            self._apply_cgate(qubit_groups, gate)
 
-        circuit.set_state(sorted_state)
+        elif issubclass(gate.__class__, CCGate):
+            self._apply_ccgate(qubit_groups, gate)
 
-    def _apply_swap_gate(self, qubit_groups: List[QubitGroup], gate: Swap) -> None:
+        elif type(gate) == BlockGate:
+            self._apply_block_gate(qubit_groups, gate)
+
+        else:
+            raise NotImplementedError(f"Unknown gate type for {gate} ({type(gate)})")
+
+        if self.split_groups and type(gate) != Swap and len(gate.qubits) > 1:
+            self._split_qubit_groups(qubit_groups, gate.qubits)
+
+    def _split_qubit_groups(
+        self, qubit_groups: QubitRegistry, qubits: List[int]
+    ) -> None:
+        """Split the qubit groups containing the specified qubits
+        in place, as far as they factorize."""
+        affected_groups = {
+            id(qubit_group): qubit_group
+            for qubit_group in (
+                select_affected_qubit_group(qubit_groups, qubit_id=qubit)
+                for qubit in qubits
+            )
+        }
+
+        for qubit_group in affected_groups.values():
+            split_groups = split_qubit_group(qubit_group, qubits)
+            if len(split_groups) > 1:
+                qubit_groups.replace(qubit_group, split_groups)
+
+    def _is_deferrable(self, qubit_groups: QubitRegistry, gate: IGate) -> bool:
+        """Indicate if a gate is a diagonal gate whose qubits are spread
+        across multiple qubit groups, so that applying it right away
+        would require merging them."""
+        if not gate.is_diagonal or len(gate.qubits) == 1:
+            return False
+
+        affected_groups = set(
+            id(select_affected_qubit_group(qubit_groups, qubit_id=qubit))
+            for qubit in gate.qubits
+        )
+        return len(affected_groups) > 1
+
+    def _apply_deferred_gates(
+        self,
+        qubit_groups: QubitRegistry,
+        deferred_gates: List[IGate],
+        qubits: List[int] = None,
+    ) -> None:
+        """Apply the deferred gates that act on any of the specified
+        qubits (or all deferred gates if no qubits are specified)
+        and remove them from the list of deferred gates in place."""
+        remaining_gates = []
+        for gate in deferred_gates:
+            if qubits is None or any(qubit in qubits for qubit in gate.qubits):
+                self._apply(qubit_groups, gate)
+            else:
+                remaining_gates.append(gate)
+
+        deferred_gates[:] = remaining_gates
+
+    def _apply_swap_gate(self, qubit_groups: QubitRegistry, gate: Swap) -> None:
         apply_swap_gate(qubit_groups, gate)
 
-    def _apply_gate(self, qubit_groups: List[QubitGroup], gate: Gate) -> None:
+    def _apply_gate(self, qubit_groups: QubitRegistry, gate: Gate) -> None:
         target_qubit_group = select_affected_qubit_group(
             qubit_groups, qubit_id=gate.target_qubit
         )
 
-        apply_gate(target_qubit_group, gate)
+        self.engine.apply_gate(
+            target_qubit_group, gate, qubit_groups.positions([gate.target_qubit])
+        )
 
-    def _apply_cgate(self, qubit_groups: List[QubitGroup], gate: CGate) -> None:
+    def _apply_cgate(self, qubit_groups: QubitRegistry, gate: CGate) -> None:
         control_qubit_group = select_affected_qubit_group(
             qubit_groups, qubit_id=gate.control_qubit
         )
@@ -118,194 +730,126 @@ class QuaSim:
             qubit_groups, qubit_id=gate.target_qubit
         )
 
-        if len(control_qubit_group.qubits) == 1:
-            # Conrol qubit is inactive
-            if is_in_ket0(control_qubit_group):
-                pass
-            # Control qubit is active
-            elif is_in_ket1(control_qubit_group):
-                apply_gate(target_qubit_group, gate)
-            # Control qubit is in superposition state
-            else:
-                merged_qubit_group = merge_qubit_groups(
-                    relevant_groups=[control_qubit_group, target_qubit_group],
-                    total_groups=qubit_groups,
-                )
-                apply_cgate(merged_qubit_group, gate)
+        control_bit = self._get_control_bit(
+            qubit_groups, gate.control_qubit, target_qubit_group
+        )
+
+        # Control qubit is inactive
+        if control_bit == 0:
+            pass
+
+        # Control qubit is active
+        elif control_bit == 1:
+            self.engine.apply_gate(
+                target_qubit_group, gate, qubit_groups.positions([gate.target_qubit])
+            )
 
+        # Control qubit is in superposition state
         else:
             merged_qubit_group = merge_qubit_groups(
                 relevant_groups=[control_qubit_group, target_qubit_group],
                 total_groups=qubit_groups,
             )
-            apply_cgate(merged_qubit_group, gate)
+            self.engine.apply_cgate(
+                merged_qubit_group, gate, qubit_groups.positions(gate.qubits)
+            )
 
-    def _apply_ccgate(self, qubit_groups: List[QubitGroup], gate: CCGate) -> None:
-        control_qubit1_group = select_affected_qubit_group(
-            qubit_groups, qubit_id=gate.control_qubit1
-        )
-        control_qubit2_group = select_affected_qubit_group(
-            qubit_groups, qubit_id=gate.control_qubit2
-        )
+    def _apply_ccgate(self, qubit_groups: QubitRegistry, gate: CCGate) -> None:
         target_qubit_group = select_affected_qubit_group(
             qubit_groups, qubit_id=gate.target_qubit
         )
 
-        if (
-            len(control_qubit1_group.qubits) == 1
-            and len(control_qubit2_group.qubits) == 1
-        ):
-
-            # Control qubit 1 is inactive
-            if is_in_ket0(control_qubit1_group):
-                pass
-
-            # Control qubit 1 is active
-            elif is_in_ket1(control_qubit1_group):
-
-                # Control qubit 2 is inactive
-                if is_in_ket0(control_qubit2_group):
-                    pass
-
-                # Control qubit 2 is active
-                elif is_in_ket1(control_qubit2_group):
-                    apply_gate(target_qubit_group, gate)
-
-                # Control qubit 2 is in superposition
-                else:
-                    equivalent_cgate = CGate(
-                        control_qubit=gate.control_qubit2,
-                        target_qubit=gate.target_qubit,
-                    )
-                    equivalent_cgate.matrix = gate.matrix
-
-                    merged_qubit_group = merge_qubit_groups(
-                        relevant_groups=[
-                            control_qubit2_group,
-                            target_qubit_group,
-                        ],
-                        total_groups=qubit_groups,
-                    )
-                    apply_cgate(merged_qubit_group, equivalent_cgate)
-
-            # Control qubit 1 is in superposition
-            else:
-
-                # Control qubit 2 is inactive
-                if is_in_ket0(control_qubit2_group):
-                    pass
-
-                # Control qubit 2 is active
-                elif is_in_ket1(control_qubit2_group):
-                    equivalent_cgate = CGate(
-                        control_qubit=gate.control_qubit1,
-                        target_qubit=gate.target_qubit,
-                    )
-                    equivalent_cgate.matrix = gate.matrix
-
-                    merged_qubit_group = merge_qubit_groups(
-                        relevant_groups=[
-                            control_qubit1_group,
-                            target_qubit_group,
-                        ],
-                        total_groups=qubit_groups,
-                    )
-                    apply_cgate(merged_qubit_group, equivalent_cgate)
-
-                # Control qubit 2 is in superposition
-                else:
-                    merged_qubit_group = merge_qubit_groups(
-                        relevant_groups=[
-                            control_qubit1_group,
-                            control_qubit2_group,
-                            target_qubit_group,
-                        ],
-                        total_groups=qubit_groups,
-                    )
-                    apply_ccgate(merged_qubit_group, gate)
-
-        elif (
-            len(control_qubit1_group.qubits) == 1
-        ):  # and control qubit 2 group contains multiple qubits
-
-            # Control qubit 1 is inactive
-            if is_in_ket0(control_qubit1_group):
-                pass
-
-            # Control qubit 1 is active
-            elif is_in_ket1(control_qubit1_group):
-                equivalent_cgate = CGate(
-                    control_qubit=gate.control_qubit2,
-                    target_qubit=gate.target_qubit,
-                )
-                equivalent_cgate.matrix = gate.matrix
-
-                merged_qubit_group = merge_qubit_groups(
-                    relevant_groups=[
-                        control_qubit2_group,
-                        target_qubit_group,
-                    ],
-                    total_groups=qubit_groups,
-                )
-                apply_cgate(merged_qubit_group, equivalent_cgate)
+        superposed_control_qubits = []
+        for control_qubit in (gate.control_qubit1, gate.control_qubit2):
+            control_bit = self._get_control_bit(
+                qubit_groups, control_qubit, target_qubit_group
+            )
 
-            # Control qubit 1 is in superposition
-            else:
-                merged_qubit_group = merge_qubit_groups(
-                    relevant_groups=[
-                        control_qubit1_group,
-                        control_qubit2_group,
-                        target_qubit_group,
-                    ],
-                    total_groups=qubit_groups,
-                )
-                apply_ccgate(merged_qubit_group, gate)
+            # Control qubit is inactive
+            if control_bit == 0:
+                return
 
-        elif (
-            len(control_qubit2_group.qubits) == 1
-        ):  # and control qubit 1 group contains multiple qubits
+            # Control qubit is in superposition state
+            if control_bit is None:
+                superposed_control_qubits.append(control_qubit)
 
-            # Control qubit 2 is inactive
-            if is_in_ket0(control_qubit2_group):
-                pass
+        # Both control qubits are active
+        if len(superposed_control_qubits) == 0:
+            self.engine.apply_gate(
+                target_qubit_group, gate, qubit_groups.positions([gate.target_qubit])
+            )
 
-            # Control qubit 2 is active
-            elif is_in_ket1(control_qubit2_group):
-                equivalent_cgate = CGate(
-                    control_qubit=gate.control_qubit1,
-                    target_qubit=gate.target_qubit,
-                )
-                equivalent_cgate.matrix = gate.matrix
-
-                merged_qubit_group = merge_qubit_groups(
-                    relevant_groups=[
-                        control_qubit1_group,
-                        target_qubit_group,
-                    ],
-                    total_groups=qubit_groups,
-                )
-                apply_cgate(merged_qubit_group, equivalent_cgate)
+        # One control qubit is active
+        elif len(superposed_control_qubits) == 1:
+            (control_qubit,) = superposed_control_qubits
+            equivalent_cgate = create_equivalent_cgate(
+                gate, control_qubit=control_qubit
+            )
 
-            # Control qubit 2 is in superposition
-            else:
-                merged_qubit_group = merge_qubit_groups(
-                    relevant_groups=[
-                        control_qubit1_group,
-                        control_qubit2_group,
-                        target_qubit_group,
-                    ],
-                    total_groups=qubit_groups,
-                )
-                apply_ccgate(merged_qubit_group, gate)
+            merged_qubit_group = merge_qubit_groups(
+                relevant_groups=[
+                    select_affected_qubit_group(qubit_groups, qubit_id=control_qubit),
+                    target_qubit_group,
+                ],
+                total_groups=qubit_groups,
+            )
+            self.engine.apply_cgate(
+                merged_qubit_group,
+                equivalent_cgate,
+                qubit_groups.positions(equivalent_cgate.qubits),
+            )
 
-        # both qubit groups contain more than 1 qubit
         else:
             merged_qubit_group = merge_qubit_groups(
                 relevant_groups=[
-                    control_qubit1_group,
-                    control_qubit2_group,
+                    select_affected_qubit_group(
+                        qubit_groups, qubit_id=gate.control_qubit1
+                    ),
+                    select_affected_qubit_group(
+                        qubit_groups, qubit_id=gate.control_qubit2
+                    ),
                     target_qubit_group,
                 ],
                 total_groups=qubit_groups,
             )
-            apply_ccgate(merged_qubit_group, gate)
+            self.engine.apply_ccgate(
+                merged_qubit_group, gate, qubit_groups.positions(gate.qubits)
+            )
+
+    def _get_control_bit(
+        self,
+        qubit_groups: QubitRegistry,
+        control_qubit: int,
+        target_qubit_group: QubitGroup,
+    ) -> Optional[int]:
+        """Return the value of a control qubit if it is in a computational
+        basis state, otherwise None.
+
+        Control qubits within the target qubit group are not checked
+        (None is returned), since the gate can be applied to them
+        without merging any qubit groups.
+        """
+        control_qubit_group = select_affected_qubit_group(
+            qubit_groups, qubit_id=control_qubit
+        )
+        if control_qubit_group is target_qubit_group:
+            return None
+
+        return get_classical_bit(
+            control_qubit_group, qubit_groups.position(control_qubit)
+        )
+
+    def _apply_block_gate(
+        self, qubit_groups: QubitRegistry, gate: BlockGate
+    ) -> None:
+        affected_qubit_groups = [
+            select_affected_qubit_group(qubit_groups, qubit_id=qubit)
+            for qubit in gate.qubits
+        ]
+
+        merged_qubit_group = merge_qubit_groups(
+            relevant_groups=affected_qubit_groups, total_groups=qubit_groups
+        )
+        self.engine.apply_block_gate(
+            merged_qubit_group, gate, qubit_groups.positions(gate.qubits)
+        )
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+from functools import reduce
+import numpy as np
+from typing import Dict, List, Sequence, Union
+
+from .kernels import pauli_expectation_kernel
+from .sampling import CumulativeSampler, Seed
+from .utils import (
+    QubitGroup,
+    get_sorted_state,
+    kron_states,
+    plan_merge,
+    probabilities_from_state,
+)
+
+BasisStates = Union[int, str, Sequence[int], Sequence[str], np.ndarray]
+
+
+class FactorizedState:
+    """State of a register that is kept as the product of the states
+    of its qubit groups, as left by the simulator at the end of a
+    circuit.
+
+    Amplitudes, marginal probabilities and samples are computed from
+    the group states, so that their cost only depends on the size of
+    the largest qubit group. The full state vector of 2^qubit_num
+    amplitudes is only built by to_state.
+
+    Basis states are given either as indices, where qubit 0 is the
+    most significant bit, or as bit strings, where the first character
+    corresponds to qubit 0. Indices are limited to 63 qubits.
+    """
+
+    qubit_num: int
+    qubit_groups: List[QubitGroup]
+
+    def __init__(self, qubit_groups: List[QubitGroup], qubit_num: int) -> None:
+        self.qubit_groups = qubit_groups
+        self.qubit_num = qubit_num
+
+        self._probabilities: List[np.ndarray] = None
+        self._samplers: List[CumulativeSampler] = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(qubit_group.state.nbytes for qubit_group in self.qubit_groups)
+
+    @property
+    def group_probabilities(self) -> List[np.ndarray]:
+        """Returns the probabilities of the basis states of every
+        qubit group, in the order of the group's qubits."""
+        if self._probabilities is None:
+            self._probabilities = [
+                probabilities_from_state(qubit_group.state)
+                for qubit_group in self.qubit_groups
+            ]
+        return self._probabilities
+
+    def to_state(self) -> np.ndarray:
+        """Returns the full state vector, whose amplitudes are sorted
+        by qubit index."""
+        qubit_groups = plan_merge(self.qubit_groups)
+
+        qubits = [qubit for qubit_group in qubit_groups for qubit in qubit_group.qubits]
+        state = kron_states([qubit_group.state for qubit_group in qubit_groups])
+        return get_sorted_state(QubitGroup(qubits=qubits, state=state))
+
+    def amplitudes(self, basis_states: BasisStates) -> np.ndarray:
+        """Returns the amplitudes of the specified basis states."""
+        bits = self._get_bits(basis_states)
+
+        amplitudes = np.ones(len(bits), dtype=np.complex128)
+        for qubit_group in self.qubit_groups:
+            local_indices = _get_local_indices(bits, qubit_group.qubits)
+            amplitudes *= qubit_group.state[local_indices]
+
+        return amplitudes
+
+    def amplitude(self, basis_state: Union[int, str]) -> complex:
+        """Returns the amplitude of a single basis state."""
+        return complex(self.amplitudes([basis_state])[0])
+
+    def probabilities(self, basis_states: BasisStates) -> np.ndarray:
+        """Returns the probabilities of the specified basis states."""
+        return probabilities_from_state(self.amplitudes(basis_states))
+
+    def qubit_probabilities(self) -> np.ndarray:
+        """Returns the probability of measuring each qubit in |1>,
+        indexed by qubit."""
+        qubit_probabilities = np.zeros(self.qubit_num)
+
+        for qubit_group, probabilities in zip(
+            self.qubit_groups, self.group_probabilities
+        ):
+            tensor = probabilities.reshape((2,) * len(qubit_group.qubits))
+            for position, qubit in enumerate(qubit_group.qubits):
+                qubit_probabilities[qubit] = np.moveaxis(tensor, position, 0)[1].sum()
+
+        return qubit_probabilities
+
+    def marginal(self, qubits: Sequence[int]) -> np.ndarray:
+        """Returns the probabilities of the basis states of the specified
+        qubits, where the first specified qubit is the most significant
+        bit. All other qubits are traced out."""
+        if len(set(qubits)) != len(qubits):
+            raise ValueError(f"Duplicate qubits in {qubits}")
+
+        selected_qubits = set(qubits)
+
+        tensors = []
+        labels = []
+        for qubit_group, probabilities in zip(
+            self.qubit_groups, self.group_probabilities
+        ):
+            traced_axes = tuple(
+                position
+                for position, qubit in enumerate(qubit_group.qubits)
+                if qubit not in selected_qubits
+            )
+            if len(traced_axes) == len(qubit_group.qubits):
+                continue
+
+            tensor = probabilities.reshape((2,) * len(qubit_group.qubits))
+            tensors.append(tensor.sum(axis=traced_axes))
+            labels.extend(
+                qubit for qubit in qubit_group.qubits if qubit in selected_qubits
+            )
+
+        if len(labels) != len(qubits):
+            raise ValueError(f"Unknown qubits in {qubits}")
+
+        # The qubit groups are independent, so the marginal probabilities
+        # of the groups combine through an outer product.
+        marginal = reduce(np.multiply.outer, tensors, np.ones(()))
+
+        axes = {qubit: axis for axis, qubit in enumerate(labels)}
+        marginal = np.transpose(marginal, axes=[axes[qubit] for qubit in qubits])
+        return marginal.reshape(-1)
+
+    def expectation(self, pauli_string: Dict[int, str]) -> float:
+        """Returns the expectation value of a Pauli string, given as
+        dictionary of the Paulis ("X", "Y", or "Z") acting on each
+        qubit.
+
+        Since the qubit groups are independent, the expectation value
+        is the product of the expectation values of the parts of the
+        Pauli string acting on each qubit group. Qubit groups without
+        any Pauli contribute a factor of 1.
+        """
+        expectation = 1.0
+        for qubit_group in self.qubit_groups:
+            flips, signs = [], []
+            for position, qubit in enumerate(qubit_group.qubits):
+                pauli = pauli_string.get(qubit, "I")
+                if pauli in ("X", "Y"):
+                    flips.append(position)
+                if pauli in ("Y", "Z"):
+                    signs.append(position)
+
+            if len(flips) == 0 and len(signs) == 0:
+                continue
+
+            expectation *= pauli_expectation_kernel(
+                qubit_group.state, flips, signs, qubit_num=len(qubit_group.qubits)
+            ).real
+
+        return float(expectation)
+
+    @property
+    def samplers(self) -> List[CumulativeSampler]:
+        """Returns a sampler of the basis states of every qubit group,
+        which is created on first access."""
+        if self._samplers is None:
+            self._samplers = [
+                CumulativeSampler(probabilities)
+                for probabilities in self.group_probabilities
+            ]
+        return self._samplers
+
+    def sample(self, shots: int, seed: Seed = None) -> np.ndarray:
+        """Samples measurements of all qubits and returns them as
+        an array of bits of shape (shots, qubit_num), indexed by
+        qubit. The qubit groups are sampled independently."""
+        rng = np.random.default_rng(seed)
+
+        bits = np.zeros((shots, self.qubit_num), dtype=np.uint8)
+        for qubit_group, sampler in zip(self.qubit_groups, self.samplers):
+            local_indices = sampler.sample(shots, seed=rng)
+
+            qubit_num = len(qubit_group.qubits)
+            shifts = np.arange(qubit_num - 1, -1, -1)
+            bits[:, qubit_group.qubits] = (local_indices[:, None] >> shifts) & 1
+
+        return bits
+
+    def sample_indices(self, shots: int, seed: Seed = None) -> np.ndarray:
+        """Samples measurements of all qubits and returns the indices
+        of the measured basis states. The qubit groups are sampled
+        independently."""
+        if self.qubit_num > 63:
+            raise ValueError(
+                "Basis states of more than 63 qubits can only be sampled as bits"
+            )
+
+        rng = np.random.default_rng(seed)
+
+        indices = np.zeros(shots, dtype=np.int64)
+        for qubit_group, sampler in zip(self.qubit_groups, self.samplers):
+            local_indices = sampler.sample(shots, seed=rng)
+
+            # Every measured basis state of the group contributes the bits
+            # of its qubits to the index of the register. Only the drawn
+            # indices are mapped, so that the cost does not depend on the
+            # size of the group.
+            qubit_num = len(qubit_group.qubits)
+            shifts = np.arange(qubit_num - 1, -1, -1)
+            weights = 1 << (
+                self.qubit_num - 1 - np.array(qubit_group.qubits, dtype=np.int64)
+            )
+            indices += ((local_indices[:, None] >> shifts) & 1) @ weights
+
+        return indices
+
+    def _get_bits(self, basis_states: BasisStates) -> np.ndarray:
+        """Converts basis states into an array of bits of shape
+        (len(basis_states), qubit_num), indexed by qubit."""
+        if isinstance(basis_states, (int, np.integer, str)):
+            basis_states = [basis_states]
+
+        if len(basis_states) > 0 and isinstance(basis_states[0], str):
+            if any(len(bit_string) != self.qubit_num for bit_string in basis_states):
+                raise ValueError(
+                    f"Bit strings have to consist of {self.qubit_num} bits"
+                )
+
+            characters = np.frombuffer(
+                "".join(basis_states).encode(), dtype=np.uint8
+            )
+            return (characters - ord("0")).reshape(-1, self.qubit_num)
+
+        if self.qubit_num > 63:
+            raise ValueError(
+                "Basis states of more than 63 qubits have to be given as bit strings"
+            )
+
+        shifts = np.arange(self.qubit_num - 1, -1, -1, dtype=np.int64)
+        indices = np.asarray(basis_states, dtype=np.int64).reshape(-1)
+        return ((indices[:, None] >> shifts) & 1).astype(np.uint8)
+
+
+def _get_local_indices(bits: np.ndarray, qubits: List[int]) -> np.ndarray:
+    """Returns the indices into the state of a qubit group with the
+    specified qubits that correspond to the specified bits."""
+    weights = 1 << np.arange(len(qubits) - 1, -1, -1, dtype=np.int64)
+    return bits[:, qubits].astype(np.int64) @ weights
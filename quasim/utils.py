@@ -1,16 +1,17 @@
 #!/usr/bin/env python3
 
 from dataclasses import dataclass
+from functools import reduce
 import math
 import numpy as np
-from typing import List
-import warnings
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from .gates import Swap, Gate, CGate, CCGate
+from .gates import IGate, Swap, Gate, CGate, CCGate, BlockGate
 from .gates.utils import (
-    create_double_controlled_matrix,
-    create_controlled_matrix,
-    create_matrix,
+    get_double_controlled_matrix,
+    get_controlled_matrix,
+    get_matrix,
+    get_block_matrix,
 )
 
 QUBIT_STARTING_STATE = np.zeros(2, dtype=np.complex128)
@@ -31,149 +32,523 @@ class QubitGroup:
         return hash(qubit_string)
 
 
+def plan_merge(qubit_groups: List[QubitGroup]) -> List[QubitGroup]:
+    """Return the order in which the specified qubit groups are merged:
+    the largest qubit group first, followed by the other qubit groups
+    by ascending size.
+
+    In this order, kron_states combines the smaller states into an
+    intermediate state of at most half the size of the merged state
+    (and smaller intermediates before that), and the merged state is
+    allocated only once. The qubits of the largest group also keep
+    their positions.
+    """
+    if len(qubit_groups) == 1:
+        return list(qubit_groups)
+
+    sizes = [len(qubit_group.qubits) for qubit_group in qubit_groups]
+    largest_position = sizes.index(max(sizes))
+    other_groups = [
+        qubit_group
+        for position, qubit_group in enumerate(qubit_groups)
+        if position != largest_position
+    ]
+    other_groups.sort(key=lambda qubit_group: len(qubit_group.qubits))
+
+    return [qubit_groups[largest_position]] + other_groups
+
+
+def kron_states(states: List[np.ndarray]) -> np.ndarray:
+    """Return the Kronecker product of the specified states.
+
+    All states but the first are combined first, so that the product
+    is allocated once by a final outer product with the first state.
+    The states should be ordered by plan_merge.
+    """
+    if len(states) == 1:
+        return states[0]
+
+    tail_state = reduce(np.multiply.outer, states[1:]).reshape(-1)
+    return np.multiply.outer(states[0], tail_state).reshape(-1)
+
+
+def check_qubit(qubit: int, qubit_num: int) -> None:
+    """Raise ValueError if the specified qubit does not belong to a
+    register of qubit_num qubits."""
+    if not 0 <= qubit < qubit_num:
+        raise ValueError(f"No matching qubit group found for qubit '{qubit}'")
+
+
+class QubitRegistry:
+    """Registry of the qubit groups of a register, which maps every
+    qubit onto its qubit group and its position within the group (i.e.
+    the axis of the group state belonging to the qubit) in constant
+    time.
+
+    All changes to the qubits of the registered qubit groups have to
+    be made through the registry, so that both maps are kept up to
+    date. Qubits are identified by their index in the register; other
+    qubits raise a ValueError.
+    """
+
+    def __init__(self, qubit_groups: List[QubitGroup]) -> None:
+        qubit_num = sum(len(qubit_group.qubits) for qubit_group in qubit_groups)
+
+        self._qubit_groups: Dict[int, QubitGroup] = {}
+        self._groups_of_qubits: List[QubitGroup] = [None] * qubit_num
+        self._positions_of_qubits: List[int] = [0] * qubit_num
+
+        for qubit_group in qubit_groups:
+            self.add(qubit_group)
+
+    def __iter__(self) -> Iterator[QubitGroup]:
+        return iter(self._qubit_groups.values())
+
+    def __len__(self) -> int:
+        return len(self._qubit_groups)
+
+    @property
+    def qubit_groups(self) -> List[QubitGroup]:
+        return list(self._qubit_groups.values())
+
+    def select(self, qubit: int) -> QubitGroup:
+        """Return the qubit group containing the specified qubit."""
+        check_qubit(qubit, len(self._groups_of_qubits))
+        return self._groups_of_qubits[qubit]
+
+    def position(self, qubit: int) -> int:
+        """Return the position of the specified qubit within its group."""
+        check_qubit(qubit, len(self._positions_of_qubits))
+        return self._positions_of_qubits[qubit]
+
+    def positions(self, qubits: Sequence[int]) -> List[int]:
+        """Return the positions of the specified qubits within their groups."""
+        return [self.position(qubit) for qubit in qubits]
+
+    def add(self, qubit_group: QubitGroup) -> None:
+        """Register a qubit group and all of its qubits."""
+        self._qubit_groups[id(qubit_group)] = qubit_group
+        self._register_qubits(qubit_group, start=0)
+
+    def merge(self, qubit_groups: List[QubitGroup]) -> QubitGroup:
+        """Merge the specified qubit groups into the largest of them, which
+        is returned, and unregister the other qubit groups (see plan_merge).
+        Only the qubits of the other qubit groups are registered again."""
+
+        # remove duplicates while keeping the order of the groups
+        qubit_groups = list({id(group): group for group in qubit_groups}.values())
+        qubit_groups = plan_merge(qubit_groups)
+
+        merged_qubit_group = qubit_groups[0]
+        if len(qubit_groups) == 1:
+            return merged_qubit_group
+
+        start = len(merged_qubit_group.qubits)
+
+        merged_qubit_group.state = kron_states(
+            [qubit_group.state for qubit_group in qubit_groups]
+        )
+        for qubit_group in qubit_groups[1:]:
+            merged_qubit_group.qubits.extend(qubit_group.qubits)
+            del self._qubit_groups[id(qubit_group)]
+
+        self._register_qubits(merged_qubit_group, start=start)
+
+        return merged_qubit_group
+
+    def replace(self, qubit_group: QubitGroup, qubit_groups: List[QubitGroup]) -> None:
+        """Replace a qubit group by qubit groups containing the same qubits,
+        e.g. after it has been split."""
+        del self._qubit_groups[id(qubit_group)]
+        for new_qubit_group in qubit_groups:
+            self.add(new_qubit_group)
+
+    def swap(self, qubit1: int, qubit2: int) -> None:
+        """Exchange two qubits by relabeling them, which leaves all
+        group states untouched."""
+        qubit_group1, position1 = self.select(qubit1), self.position(qubit1)
+        qubit_group2, position2 = self.select(qubit2), self.position(qubit2)
+
+        qubit_group1.qubits[position1] = qubit2
+        qubit_group2.qubits[position2] = qubit1
+
+        self._groups_of_qubits[qubit1] = qubit_group2
+        self._groups_of_qubits[qubit2] = qubit_group1
+        self._positions_of_qubits[qubit1] = position2
+        self._positions_of_qubits[qubit2] = position1
+
+    def copy(self) -> "QubitRegistry":
+        """Return a copy that does not share any mutable data."""
+        return QubitRegistry(
+            [
+                QubitGroup(
+                    qubits=list(qubit_group.qubits), state=qubit_group.state.copy()
+                )
+                for qubit_group in self
+            ]
+        )
+
+    def __reduce__(self) -> Tuple:
+        # The groups are keyed by their ids, which change when unpickled.
+        return QubitRegistry, (self.qubit_groups,)
+
+    def _register_qubits(self, qubit_group: QubitGroup, start: int) -> None:
+        for position in range(start, len(qubit_group.qubits)):
+            qubit = qubit_group.qubits[position]
+            self._groups_of_qubits[qubit] = qubit_group
+            self._positions_of_qubits[qubit] = position
+
+
+@dataclass
+class SimulationState:
+    """Helper class used to store the intermediate state of the
+    simulator after a number of gates has been applied, consisting
+    of the qubit groups and the gates whose application has been
+    deferred."""
+
+    qubit_groups: QubitRegistry
+    deferred_gates: List[IGate]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(qubit_group.state.nbytes for qubit_group in self.qubit_groups)
+
+    def copy(self) -> "SimulationState":
+        """Return a copy that does not share any mutable data."""
+        return SimulationState(
+            qubit_groups=self.qubit_groups.copy(),
+            deferred_gates=list(self.deferred_gates),
+        )
+
+
 def probabilities_from_state(state: np.ndarray) -> np.ndarray:
     """Returns the probabilities corresponding to a quantum
     system state."""
 
-    conjugate = state.conjugate()
+    return np.square(state.real) + np.square(state.imag)
 
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
 
-        # Ignore "np.complex128Warning: Casting np.complex128 values to real discards the imaginary part"
-        # since that is precisely what we want.
-        probabilities = np.multiply(state, conjugate).astype(float)
+def bit_strings_from_indices(indices: np.ndarray, qubit_num: int) -> List[str]:
+    """Returns the bit strings of the specified basis state indices,
+    where the first character corresponds to qubit 0.
+    """
+    if qubit_num == 0:
+        return [""] * len(indices)
 
-    return probabilities
+    shifts = np.arange(qubit_num - 1, -1, -1)
+    bits = (np.asarray(indices)[:, None] >> shifts) & 1
 
+    characters = (bits + ord("0")).astype(np.uint8)
+    bit_strings = characters.view(f"S{qubit_num}").ravel()
+    return bit_strings.astype(str).tolist()
 
-def state_dict_from_state(state: np.ndarray) -> np.ndarray:
-    """Returns a dictionary of the states where the coefficients of
-    the states are different from 0.
+
+def select_indices(
+    values: np.ndarray, tolerance: float = 0.0, top_k: int = None
+) -> np.ndarray:
+    """Returns the indices of all values whose magnitude is different
+    from 0 and at least equal to the specified tolerance.
+
+    If top_k is specified, only the indices of the top_k values
+    with the largest magnitudes are returned, ordered by descending
+    magnitude. Otherwise, the indices are returned in ascending order.
     """
-    qubit_num = int(math.log2(len(state)))
+    magnitudes = np.abs(values)
+    indices = np.flatnonzero((magnitudes != 0) & (magnitudes >= tolerance))
 
-    state_dict = {}
+    if top_k is None:
+        return indices
 
-    for i, state in enumerate(state):
+    if top_k < len(indices):
+        top_positions = np.argpartition(-magnitudes[indices], top_k - 1)[:top_k]
+        indices = indices[top_positions]
 
-        if state == 0:
-            continue
+    return indices[np.argsort(-magnitudes[indices], kind="stable")]
 
-        qubit_state: str = ""
 
-        remainder = i
-        for j in reversed(range(qubit_num)):
+def state_dict_from_state(
+    state: np.ndarray,
+    tolerance: float = 0.0,
+    top_k: int = None,
+    integer_keys: bool = False,
+) -> Dict:
+    """Returns a dictionary of the states where the coefficients of
+    the states are different from 0.
 
-            if remainder >= 2**j:
-                qubit_state += "1"
-                remainder -= 2**j
-            else:
-                qubit_state += "0"
+    Coefficients with a magnitude below the tolerance are treated
+    as 0. If top_k is specified, only the top_k coefficients with
+    the largest magnitudes are kept. If integer_keys is set, the
+    states are keyed by their index instead of their bit string.
+    """
+    qubit_num = int(math.log2(len(state)))
+
+    indices = select_indices(state, tolerance=tolerance, top_k=top_k)
 
-        state_dict[qubit_state] = state
+    if integer_keys:
+        keys = indices.tolist()
+    else:
+        keys = bit_strings_from_indices(indices, qubit_num)
 
-    return state_dict
+    return dict(zip(keys, state[indices].tolist()))
 
 
-def probability_dict_from_state(state: np.ndarray) -> np.ndarray:
+def probability_dict_from_state(
+    state: np.ndarray,
+    tolerance: float = 0.0,
+    top_k: int = None,
+    integer_keys: bool = False,
+) -> Dict:
     """Returns a dictionary of the probabilities corresponding
     to the specified state. States with a probability of 0 are
     omitted.
+
+    Probabilities below the tolerance are treated as 0. If top_k
+    is specified, only the top_k most probable states are kept.
+    If integer_keys is set, the states are keyed by their index
+    instead of their bit string.
     """
 
     qubit_num = int(math.log2(len(state)))
 
     probabilities = probabilities_from_state(state)
 
-    probability_dict = {}
-    for i, probability in enumerate(probabilities):
+    indices = select_indices(probabilities, tolerance=tolerance, top_k=top_k)
 
-        if probability == 0:
-            continue
+    if integer_keys:
+        keys = indices.tolist()
+    else:
+        keys = bit_strings_from_indices(indices, qubit_num)
 
-        state: str = ""
+    return dict(zip(keys, probabilities[indices].tolist()))
 
-        remainder = i
-        for j in reversed(range(qubit_num)):
 
-            if remainder >= 2**j:
-                state += "1"
-                remainder -= 2**j
-            else:
-                state += "0"
+def counts_from_indices(
+    indices: np.ndarray, qubit_num: int, integer_keys: bool = False
+) -> Dict:
+    """Returns a dictionary of the amount of occurrences of every
+    sampled basis state index, ordered by index.
 
-        probability_dict[state] = probability
+    If integer_keys is set, the states are keyed by their index
+    instead of their bit string.
+    """
+    unique_indices, counts = np.unique(indices, return_counts=True)
+
+    if integer_keys:
+        keys = unique_indices.tolist()
+    else:
+        keys = bit_strings_from_indices(unique_indices, qubit_num)
+
+    return dict(zip(keys, counts.tolist()))
+
+
+def factorize_state(
+    state: np.ndarray, tolerance: float, samples: int = 32
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Factorize a state whose first axis corresponds to one set of
+    qubits and whose remaining axes correspond to another set of
+    qubits into the states of both sets, so that np.outer(left,
+    right) equals the state reshaped to (rows, columns).
+
+    The state factorizes if its rows are multiples of each other,
+    i.e. if it has a rank of 1. Since all 2x2 minors of such a state
+    vanish, a few randomly sampled minors are checked first, which
+    rejects most entangled states without a pass over the state.
+    Otherwise, the largest row is taken as right state and the left
+    state is obtained by projecting all rows onto it. If the residual
+    exceeds the tolerance (in norm), None is returned.
+    """
+    rows, columns = state.shape[0], state[0].size
 
-    return probability_dict
+    generator = np.random.default_rng(0)
+    sampled_rows = generator.integers(rows, size=(2, samples))
+    sampled_columns = np.unravel_index(
+        generator.integers(columns, size=(2, samples)), state.shape[1:]
+    )
 
+    def sample(row: int, column: int) -> np.ndarray:
+        return state[
+            (sampled_rows[row],) + tuple(axis[column] for axis in sampled_columns)
+        ]
 
-def is_in_ket0(qubit_group: QubitGroup) -> bool:
-    """Indicate if a specified qubit group is in ket0 state.
-    If the qubit group contains more than 1 qubit, a
-    NotImplementedError is raised.
-    """
+    products = sample(0, 0) * sample(1, 1), sample(0, 1) * sample(1, 0)
+    if np.any(
+        np.abs(products[0] - products[1])
+        > 1e-6 * (np.abs(products[0]) + np.abs(products[1]))
+    ):
+        return None
+
+    state = state.reshape(rows, columns)
+
+    row_norms = probabilities_from_state(state).sum(axis=1)
+    row = np.argmax(row_norms)
 
-    if len(qubit_group.qubits) != 1:
-        raise NotImplementedError()
+    right_state = state[row] / math.sqrt(row_norms[row])
+    left_state = state @ right_state.conj()
 
-    return qubit_group.state.tolist()[0] == 1
+    residual = state - np.outer(left_state, right_state)
+    if probabilities_from_state(residual).sum() > tolerance**2:
+        return None
 
+    return left_state, right_state
 
-def is_in_ket1(qubit_group: QubitGroup) -> bool:
-    """Indicate if a specified qubit group is in ket1 state.
-    If the qubit group contains more than 1 qubit, a
-    NotImplementedError is raised.
+
+def get_classical_bit(qubit_group: QubitGroup, position: int) -> Optional[int]:
+    """Return the value of the qubit at the specified position of a
+    qubit group if the qubit is in a computational basis state (i.e.
+    all amplitudes of the other value are 0), otherwise None.
     """
 
-    if len(qubit_group.qubits) != 1:
-        raise NotImplementedError()
+    if len(qubit_group.qubits) == 1:
+        amplitude0, amplitude1 = qubit_group.state.tolist()
+    else:
+        tensor = qubit_group.state.reshape((2,) * len(qubit_group.qubits))
+        slice0, slice1 = np.moveaxis(tensor, position, 0)
+        amplitude0, amplitude1 = slice0.any(), slice1.any()
 
-    return qubit_group.state.tolist()[1] == 1
+    if amplitude1 == 0:
+        return 0
+    if amplitude0 == 0:
+        return 1
+    return None
 
 
-def initialize_qubit_groups(qubit_num: int) -> List[QubitGroup]:
+def initialize_qubit_groups(
+    qubit_num: int, basis_state: int = 0, phase: complex = 1
+) -> List[QubitGroup]:
     """Create a list of qubit groups where each qubit group contains
     exactly one qubit id.
+
+    By default, all qubits start in |0>. Alternatively, the qubits can
+    be initialized to a computational basis state (encoded as integer
+    whose most significant bit corresponds to qubit 0) with a global
+    phase, which is attached to the first qubit group.
     """
     qubit_groups: List[QubitGroup] = []
     for i in range(qubit_num):
-        qubit_groups.append(QubitGroup(qubits=[i], state=QUBIT_STARTING_STATE))
+        state = QUBIT_STARTING_STATE.copy()
+        if get_basis_bit(basis_state, qubit_id=i, qubit_num=qubit_num) == 1:
+            state = state[::-1].copy()
+
+        qubit_groups.append(QubitGroup(qubits=[i], state=state))
+
+    if phase != 1 and qubit_num > 0:
+        qubit_groups[0].state *= phase
+
     return qubit_groups
 
 
-def get_sorted_state(qubit_group: QubitGroup) -> np.ndarray:
-    """Return a sorted version of the state of a qubit group
-    based on the order of the group's qubit ids.
+def get_basis_bit(basis_state: int, qubit_id: int, qubit_num: int) -> int:
+    """Return the value of a qubit in a computational basis state
+    encoded as integer, where qubit 0 is the most significant bit.
     """
-    qubit_num = len(qubit_group.qubits)
+    return (basis_state >> (qubit_num - qubit_id - 1)) & 1
+
+
+def get_control_qubits(gate: IGate) -> List[int]:
+    """Return the control qubits of a (double) controlled gate."""
+    if issubclass(gate.__class__, CGate):
+        return [gate.control_qubit]
+    elif issubclass(gate.__class__, CCGate):
+        return [gate.control_qubit1, gate.control_qubit2]
+    else:
+        return []
+
 
-    sorting_order = [0] * (2**qubit_num)
-    for i in range(2**qubit_num):
+def track_basis_state(
+    gates: List[IGate], qubit_num: int
+) -> Tuple[int, int, complex]:
+    """Track the state of a register that starts in |0...0> for as long
+    as the specified gates keep it in a computational basis state.
 
-        remainder = i
-        for j in reversed(range(qubit_num)):
+    The basis state is stored as integer (qubit 0 being the most
+    significant bit) and the gates are applied as bit operations,
+    while diagonal entries picked up on the way are collected in a
+    global phase. Tracking stops at the first gate that would create
+    a superposition.
 
-            if remainder >= 2**j:
-                sorting_order[i] += 2 ** (
-                    qubit_num - qubit_group.qubits[qubit_num - j - 1] - 1
+    Returns the amount of gates that have been applied, the
+    resulting basis state, and its phase.
+    """
+    basis_state, phase = 0, 1
+
+    for gate_count, gate in enumerate(gates):
+        for qubit in gate.qubits:
+            check_qubit(qubit, qubit_num)
+
+        if type(gate) == Swap:
+            bit1 = get_basis_bit(basis_state, gate.qubit1, qubit_num)
+            bit2 = get_basis_bit(basis_state, gate.qubit2, qubit_num)
+            if bit1 != bit2:
+                basis_state ^= (1 << (qubit_num - gate.qubit1 - 1)) | (
+                    1 << (qubit_num - gate.qubit2 - 1)
                 )
-                remainder -= 2**j
+            continue
+
+        if not issubclass(gate.__class__, (Gate, CGate, CCGate)):
+            return gate_count, basis_state, phase
+
+        if any(
+            get_basis_bit(basis_state, control_qubit, qubit_num) == 0
+            for control_qubit in get_control_qubits(gate)
+        ):
+            continue
+
+        target_mask = 1 << (qubit_num - gate.target_qubit - 1)
+        bit = get_basis_bit(basis_state, gate.target_qubit, qubit_num)
+
+        if gate.is_permutation:
+            basis_state ^= target_mask
+
+        elif gate.is_diagonal:
+            phase *= gate.matrix[bit, bit]
+
+        else:
+            # Gates that map the current basis state onto a single
+            # basis state have a single non-zero entry in its column.
+            column = gate.matrix[:, bit]
+            non_zero_rows = np.flatnonzero(column)
+            if len(non_zero_rows) != 1:
+                return gate_count, basis_state, phase
+
+            new_bit = non_zero_rows[0]
+            phase *= column[new_bit]
+            if new_bit != bit:
+                basis_state ^= target_mask
+
+    return len(gates), basis_state, phase
 
-    sorted_state = [0] * 2**qubit_num
-    for i in range(2**qubit_num):
-        sorted_state[sorting_order[i]] = qubit_group.state[i]
 
-    sorted_state = np.asarray(sorted_state, dtype=np.complex128)
+def get_sorted_state(qubit_group: QubitGroup) -> np.ndarray:
+    """Return a sorted version of the state of a qubit group
+    based on the order of the group's qubit ids.
+
+    The state is viewed as a tensor with one axis per qubit, so
+    that sorting reduces to a single transpose of its axes. The
+    returned state is C-contiguous.
+    """
+    qubit_num = len(qubit_group.qubits)
+
+    tensor = qubit_group.state.reshape((2,) * qubit_num)
+    sorted_tensor = np.transpose(tensor, axes=np.argsort(qubit_group.qubits))
+
+    sorted_state = np.ascontiguousarray(
+        sorted_tensor.reshape(-1), dtype=np.complex128
+    )
     return sorted_state
 
 
-def apply_gate(relevant_qubit_group: QubitGroup, gate: Gate) -> None:
+def apply_gate(
+    relevant_qubit_group: QubitGroup, gate: Gate, positions: Sequence[int] = None
+) -> None:
     """Apply the action of the specified gate onto the selected
-    qubit group in place.
+    qubit group in place. The position of the target qubit within
+    the group is looked up, unless it is specified.
     """
-    target_qubit = relevant_qubit_group.qubits.index(gate.target_qubit)
-    matrix = create_matrix(
+    if positions is None:
+        positions = [relevant_qubit_group.qubits.index(gate.target_qubit)]
+
+    (target_qubit,) = positions
+    matrix = get_matrix(
         gate.matrix,
         target_qubit=target_qubit,
         qubit_num=len(relevant_qubit_group.qubits),
@@ -181,13 +556,19 @@ def apply_gate(relevant_qubit_group: QubitGroup, gate: Gate) -> None:
     relevant_qubit_group.state = np.matmul(matrix, relevant_qubit_group.state)
 
 
-def apply_cgate(relevant_qubit_group: QubitGroup, gate: CGate) -> None:
+def apply_cgate(
+    relevant_qubit_group: QubitGroup, gate: CGate, positions: Sequence[int] = None
+) -> None:
     """Apply the action of the specified controlled gate onto the
-    selected qubit group in place.
+    selected qubit group in place. The positions of the target and
+    control qubit within the group are looked up, unless they are
+    specified.
     """
-    target_qubit = relevant_qubit_group.qubits.index(gate.target_qubit)
-    control_qubit = relevant_qubit_group.qubits.index(gate.control_qubit)
-    matrix = create_controlled_matrix(
+    if positions is None:
+        positions = [relevant_qubit_group.qubits.index(qubit) for qubit in gate.qubits]
+
+    target_qubit, control_qubit = positions
+    matrix = get_controlled_matrix(
         gate.matrix,
         control_qubit=control_qubit,
         target_qubit=target_qubit,
@@ -196,14 +577,19 @@ def apply_cgate(relevant_qubit_group: QubitGroup, gate: CGate) -> None:
     relevant_qubit_group.state = np.matmul(matrix, relevant_qubit_group.state)
 
 
-def apply_ccgate(relevant_qubit_group: QubitGroup, gate: CCGate) -> None:
+def apply_ccgate(
+    relevant_qubit_group: QubitGroup, gate: CCGate, positions: Sequence[int] = None
+) -> None:
     """Apply the action of the specified double controlled gate onto the
-    selected qubit group in place.
+    selected qubit group in place. The positions of the target and
+    control qubits within the group are looked up, unless they are
+    specified.
     """
-    target_qubit = relevant_qubit_group.qubits.index(gate.target_qubit)
-    control_qubit1 = relevant_qubit_group.qubits.index(gate.control_qubit1)
-    control_qubit2 = relevant_qubit_group.qubits.index(gate.control_qubit2)
-    matrix = create_double_controlled_matrix(
+    if positions is None:
+        positions = [relevant_qubit_group.qubits.index(qubit) for qubit in gate.qubits]
+
+    target_qubit, control_qubit1, control_qubit2 = positions
+    matrix = get_double_controlled_matrix(
         gate.matrix,
         control_qubit1=control_qubit1,
         control_qubit2=control_qubit2,
@@ -213,29 +599,50 @@ def apply_ccgate(relevant_qubit_group: QubitGroup, gate: CCGate) -> None:
     relevant_qubit_group.state = np.matmul(matrix, relevant_qubit_group.state)
 
 
-def apply_swap_gate(qubit_groups: List[QubitGroup], gate: Swap) -> None:
+def apply_block_gate(
+    relevant_qubit_group: QubitGroup, gate: BlockGate, positions: Sequence[int] = None
+) -> None:
+    """Apply the action of the specified block gate onto the
+    selected qubit group in place. The positions of the qubits
+    within the group are looked up, unless they are specified.
+    """
+    if positions is None:
+        positions = [relevant_qubit_group.qubits.index(qubit) for qubit in gate.qubits]
+
+    matrix = get_block_matrix(
+        gate.matrix,
+        target_qubits=positions,
+        qubit_num=len(relevant_qubit_group.qubits),
+    )
+    relevant_qubit_group.state = np.matmul(matrix, relevant_qubit_group.state)
+
+
+def apply_swap_gate(qubit_groups: QubitRegistry, gate: Swap) -> None:
     """Swap the indices of the qubits targetted by the swap gate
     in place.
     """
-    for qubit_group in qubit_groups:
-        for i in range(len(qubit_group.qubits)):
-            if qubit_group.qubits[i] == gate.qubit1:
-                qubit_group.qubits[i] = gate.qubit2
-
-            elif qubit_group.qubits[i] == gate.qubit2:
-                qubit_group.qubits[i] = gate.qubit1
+    qubit_groups.swap(gate.qubit1, gate.qubit2)
 
 
 def select_affected_qubit_group(
-    qubit_groups: List[QubitGroup], qubit_id: int
+    qubit_groups: QubitRegistry, qubit_id: int
 ) -> QubitGroup:
     """Select the qubit group whose qubit id
     is affected by the specified gate. Raise ValueError
     if no matching qubit group is found.
     """
+    return qubit_groups.select(qubit_id)
 
-    for qubit_group in qubit_groups:
-        if qubit_id in qubit_group.qubits:
-            return qubit_group
 
-    raise ValueError(f"No matching qubit group found for qubit '{qubit_id}'")
+def create_equivalent_cgate(gate: CCGate, control_qubit: int) -> CGate:
+    """Create a controlled gate that is equivalent to the specified
+    double controlled gate if its other control qubit is active.
+    """
+    equivalent_cgate = CGate(
+        control_qubit=control_qubit, target_qubit=gate.target_qubit
+    )
+    equivalent_cgate.matrix = gate.matrix
+    equivalent_cgate.is_diagonal = gate.is_diagonal
+    equivalent_cgate.is_permutation = gate.is_permutation
+    equivalent_cgate.is_self_inverse = gate.is_self_inverse
+    return equivalent_cgate
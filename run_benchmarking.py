@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 
-from benchmark import run_time_benchmark, run_result_benchmark
+from benchmark import (
+    run_time_benchmark,
+    run_result_benchmark,
+    run_mode_benchmark,
+    run_disk_cache_benchmark,
+    run_numerics_benchmark,
+)
 
 
 if __name__ == "__main__":
@@ -13,3 +19,7 @@ if __name__ == "__main__":
     run_result_benchmark(qubit_num=3)
     run_result_benchmark(qubit_num=5)
     run_result_benchmark(qubit_num=7)
+    run_mode_benchmark(qubit_num=5)
+    run_disk_cache_benchmark()
+    run_numerics_benchmark(qubit_num=3)
+    run_numerics_benchmark(qubit_num=5)